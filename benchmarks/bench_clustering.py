@@ -0,0 +1,82 @@
+"""
+Benchmark the clustering engine against the previous run_kmeans path (full KMeans).
+
+For each corpus size it times and scores (inertia on the full data, lower is better):
+  kmeans       run_kmeans, full KMeans from scratch (the previous path)
+  minibatch    ClusteringEngine(method="minibatch"), cold start
+  warm         MiniBatchKMeans warm-started from the centroids of an earlier fit
+  absorb 5%    partial_fit of 5% newly ingested points into the fitted centroids,
+               vs re-clustering everything
+
+Vectors are synthetic, L2-normalized and clustered (like chunk embeddings).
+
+Usage: python -m benchmarks.bench_clustering --sizes 10000,50000,200000 --k 20 --dim 256
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from src.backend.utils.clustering_utils import ClusteringEngine
+from src.backend.utils.summarization_utils import run_kmeans
+
+
+def make_vectors(n: int, dim: int, n_centers: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_centers, dim))
+    X = centers[rng.integers(0, n_centers, size=n)] + 0.6 * rng.normal(size=(n, dim))
+    X = X.astype(np.float32)
+    return X / np.linalg.norm(X, axis=1, keepdims=True)
+
+
+def inertia(X: np.ndarray, centroids: np.ndarray) -> float:
+    engine = ClusteringEngine(len(centroids))
+    engine.centroids = centroids.astype(np.float32)
+    labels = engine.predict(X)
+    diff = X - engine.centroids[labels]
+    return float(np.einsum("ij,ij->", diff, diff))
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,50000,200000")
+    parser.add_argument("--k", type=int, default=20)
+    parser.add_argument("--dim", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{'points':>8} {'mode':>11} {'seconds':>8} {'inertia':>11}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        X = make_vectors(n, args.dim, n_centers=args.k * 2)
+
+        (_, centroids), seconds = timed(lambda: run_kmeans(X, n_clusters=args.k))
+        print(f"{n:>8} {'kmeans':>11} {seconds:>8.2f} {inertia(X, centroids):>11.1f}")
+
+        engine = ClusteringEngine(args.k, method="minibatch")
+        _, seconds = timed(lambda: engine.fit(X))
+        print(f"{n:>8} {'minibatch':>11} {seconds:>8.2f} {inertia(X, engine.centroids):>11.1f}")
+
+        warm = ClusteringEngine(args.k, method="minibatch")
+        _, seconds = timed(lambda: warm.fit(X, init=engine.centroids))
+        print(f"{n:>8} {'warm':>11} {seconds:>8.2f} {inertia(X, warm.centroids):>11.1f}")
+
+        # New chunks from an incremental ingest: absorb them vs cluster everything again
+        X_new = make_vectors(max(1, n // 20), args.dim, n_centers=args.k * 2, seed=1)
+        X_all = np.vstack([X, X_new])
+        _, seconds = timed(lambda: engine.partial_fit(X_new))
+        print(f"{n:>8} {'absorb 5%':>11} {seconds:>8.2f} {inertia(X_all, engine.centroids):>11.1f}")
+        refit = ClusteringEngine(args.k, method="minibatch")
+        _, seconds = timed(lambda: refit.fit(X_all))
+        print(f"{n:>8} {'refit +5%':>11} {seconds:>8.2f} {inertia(X_all, refit.centroids):>11.1f}")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    main()
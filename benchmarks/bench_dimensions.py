@@ -0,0 +1,96 @@
+"""
+Recall/latency/memory trade-off of Matryoshka-truncated embeddings (EMBEDDING_DIM).
+
+Full-width (1024) vectors are truncated to each candidate width with
+truncate_embeddings, which is what jina-embeddings-v3 does server-side when asked
+for `dimensions`. For each width it reports recall@k against the full-width
+neighbours, brute-force search latency per query, corpus memory and KMeans time.
+
+With --source and JINA_API_KEY set, the vectors are real: the repo is chunked and
+embedded once at full width, and a held-out sample of chunks serves as queries.
+Otherwise synthetic clustered vectors whose variance decays across dimensions
+(the shape Matryoshka training produces) are used.
+
+Usage: python -m benchmarks.bench_dimensions --dims 128,256,512,1024 [--source /path/to/repo]
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+from sklearn.cluster import KMeans
+
+from src.backend.utils.embed_utils import JinaEmbedder, truncate_embeddings
+
+FULL_DIM = 1024
+
+
+def synthetic_vectors(n: int, n_clusters: int = 50, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    # Leading dimensions carry most of the signal, as in Matryoshka-trained models
+    scale = 1.0 / np.sqrt(np.arange(1, FULL_DIM + 1))
+    centers = rng.normal(size=(n_clusters, FULL_DIM))
+    labels = rng.integers(0, n_clusters, size=n)
+    vectors = (centers[labels] + 0.8 * rng.normal(size=(n, FULL_DIM))) * scale
+    return truncate_embeddings(vectors, FULL_DIM)
+
+
+def repo_vectors(source: str) -> np.ndarray:
+    from src.backend.utils.chunking_utils import chunk_repo
+    from src.backend.utils.file_utils import load_local_source
+
+    chunks = chunk_repo(load_local_source(source)["files"], use_cache=False)
+    embedder = JinaEmbedder(os.environ["JINA_API_KEY"], dimensions=FULL_DIM)
+    return np.asarray([vector for vector, _ in embedder.embed_chunks(chunks)], dtype=np.float32)
+
+
+def top_k(corpus: np.ndarray, queries: np.ndarray, k: int) -> np.ndarray:
+    scores = queries @ corpus.T
+    idx = np.argpartition(-scores, k, axis=1)[:, :k]
+    return idx
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dims", default="64,128,256,512,768,1024")
+    parser.add_argument("--points", type=int, default=20000, help="Synthetic corpus size")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--clusters", type=int, default=20, help="KMeans k for the clustering timing")
+    parser.add_argument("--source", help="Local checkout/archive to embed for real (needs JINA_API_KEY)")
+    args = parser.parse_args()
+
+    if args.source and os.getenv("JINA_API_KEY"):
+        vectors = repo_vectors(args.source)
+    else:
+        vectors = synthetic_vectors(args.points + args.queries)
+    rng = np.random.default_rng(1)
+    order = rng.permutation(len(vectors))
+    queries_full, corpus_full = vectors[order[:args.queries]], vectors[order[args.queries:]]
+    k = min(args.k, len(corpus_full) - 1)
+    truth = top_k(corpus_full, queries_full, k)
+    print(f"{len(corpus_full)} points, {len(queries_full)} queries, recall@{k} vs {FULL_DIM} dims")
+
+    print(f"{'dims':>6} {'recall':>8} {'search ms/q':>12} {'MB/1M pts':>10} {'kmeans s':>9}")
+    for dims in (int(d) for d in args.dims.split(",")):
+        corpus = truncate_embeddings(corpus_full, dims)
+        queries = truncate_embeddings(queries_full, dims)
+
+        start = time.perf_counter()
+        found = top_k(corpus, queries, k)
+        search_ms = 1000 * (time.perf_counter() - start) / len(queries)
+        recall = np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])
+
+        start = time.perf_counter()
+        KMeans(n_clusters=args.clusters, n_init=1, random_state=0).fit(corpus)
+        kmeans_s = time.perf_counter() - start
+
+        mb_per_million = dims * 4 * 1_000_000 / 1e6
+        print(f"{dims:>6} {recall:>8.3f} {search_ms:>12.3f} {mb_per_million:>10.0f} {kmeans_s:>9.2f}")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    main()
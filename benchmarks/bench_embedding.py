@@ -0,0 +1,103 @@
+"""
+Benchmark JinaEmbedder.embed_chunks against a local mock embedding server.
+
+The mock charges a fixed per-request latency plus a per-input cost, and can fail a
+fraction of requests with 503 to exercise per-batch retries.
+
+Usage: python -m benchmarks.bench_embedding --chunks 5000 --workers 8 --batch-size 128
+"""
+
+import argparse
+import json
+import multiprocessing
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.backend.utils.embed_utils import JinaEmbedder
+
+
+def make_mock_handler(latency: float, per_input: float, fail_rate: float, dim: int):
+    class MockHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            inputs = body["input"]
+            time.sleep(latency + per_input * len(inputs))
+            if random.random() < fail_rate:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            out = json.dumps({"data": [
+                {"index": i, "embedding": [random.random() for _ in range(dim)]}
+                for i in range(len(inputs))
+            ]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(out)))
+            self.end_headers()
+            self.wfile.write(out)
+
+        def log_message(self, *args):
+            pass
+
+    return MockHandler
+
+
+class MockServer(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def serve_mock(port_queue, latency, per_input, fail_rate, dim):
+    server = MockServer(("127.0.0.1", 0), make_mock_handler(latency, per_input, fail_rate, dim))
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def run(embedder, chunks):
+    start = time.perf_counter()
+    result = embedder.embed_chunks(chunks)
+    elapsed = time.perf_counter() - start
+    assert [m["i"] for _, m in result] == list(range(len(chunks))), "output order changed"
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=128)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="Fixed per-request latency (s)")
+    parser.add_argument("--per-input", type=float, default=0.001, help="Added latency per input (s)")
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--dim", type=int, default=64)
+    args = parser.parse_args()
+
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=serve_mock,
+        args=(port_queue, args.latency, args.per_input, args.fail_rate, args.dim),
+        daemon=True
+    )
+    server.start()
+    api_url = f"http://127.0.0.1:{port_queue.get()}/v1/embeddings"
+
+    chunks = [{"content": f"def f_{i}():\n    return {i}\n" * 5, "metadata": {"i": i}} for i in range(args.chunks)]
+
+    single = JinaEmbedder("mock", api_url=api_url, batch_size=args.chunks, max_batch_tokens=10**9, max_workers=1)
+    batched = JinaEmbedder("mock", api_url=api_url, batch_size=args.batch_size, max_workers=args.workers)
+
+    t_single = run(single, chunks)
+    print(f"single request:          {t_single:.2f}s")
+    t_batched = run(batched, chunks)
+    print(f"batched ({args.batch_size} x {args.workers} workers): {t_batched:.2f}s")
+    print(f"speedup: {t_single / t_batched:.1f}x")
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
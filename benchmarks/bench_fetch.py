@@ -0,0 +1,97 @@
+"""
+Benchmark serial vs concurrent file fetching against a local stub of the GitHub Contents API.
+
+Usage: python -m benchmarks.bench_fetch --files 500 --latency 0.05 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src.backend.utils import file_utils
+
+
+def make_stub_handler(latency: float, rate_limit: int):
+    state = {"remaining": rate_limit, "lock": threading.Lock()}
+
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = json.dumps({
+                "content": base64.b64encode(f"# {self.path}\nprint('hello')\n".encode()).decode()
+            }).encode()
+            with state["lock"]:
+                state["remaining"] = max(state["remaining"] - 1, 0)
+                remaining = state["remaining"]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.send_header("X-RateLimit-Remaining", str(remaining))
+            self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+
+class StubServer(ThreadingHTTPServer):
+    request_queue_size = 1024
+    daemon_threads = True
+
+
+def serve_stub(port_queue, latency: float, rate_limit: int):
+    server = StubServer(("127.0.0.1", 0), make_stub_handler(latency, rate_limit))
+    port_queue.put(server.server_address[1])
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated per-request latency (s)")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--skip-serial", action="store_true")
+    args = parser.parse_args()
+
+    # Serve from a separate process so the stub does not compete with the client for the GIL
+    port_queue = multiprocessing.Queue()
+    server = multiprocessing.Process(target=serve_stub, args=(port_queue, args.latency, 100_000), daemon=True)
+    server.start()
+    base_url = f"http://127.0.0.1:{port_queue.get()}"
+    paths = [f"pkg/module_{i}.py" for i in range(args.files)]
+
+    if not args.skip_serial:
+        file_utils.GITHUB_API_URL = base_url
+        start = time.perf_counter()
+        for path in paths:
+            file_utils.get_file_contents(repo="repo", file_path=path, owner="owner")
+        serial = time.perf_counter() - start
+        print(f"serial:     {serial:.2f}s ({args.files / serial:.1f} files/s)")
+
+    start = time.perf_counter()
+    results = asyncio.run(file_utils.fetch_file_contents_async(
+        repo="repo", owner="owner", file_paths=paths,
+        concurrency=args.concurrency, base_url=base_url
+    ))
+    concurrent = time.perf_counter() - start
+    failed = sum(1 for r in results.values() if r["status"] != "success")
+    print(f"concurrent: {concurrent:.2f}s ({args.files / concurrent:.1f} files/s, {failed} failed)")
+    if not args.skip_serial:
+        print(f"speedup:    {serial / concurrent:.1f}x")
+
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
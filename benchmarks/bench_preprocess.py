@@ -0,0 +1,94 @@
+"""
+Benchmark preprocess_points: the previous per-point dict pipeline vs the columnar PointSet.
+
+The legacy path is what summarization did before: points arrive as dicts with Python
+float lists (what scroll returns), every point gets a meta dict holding a second copy
+of its vector, and the matrix is built with np.array at the end. The columnar path
+starts from the float32 matrix scroll_points fills and only interns paths.
+Reports wall time and tracemalloc peak for each, including building the input.
+
+Usage: python -m benchmarks.bench_preprocess --points 20000 --dim 1024
+"""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.backend.utils.summarization_utils import aggregate_chunks_to_files, assign_clusters_and_scores, preprocess_points
+from src.backend.utils.point_set import PointSet
+
+
+def make_payloads(n: int):
+    # ~20 chunks per file, files spread over 40 top directories
+    files = (i % (n // 20 + 1) for i in range(n))
+    return [{"filepath": f"pkg{f % 40}/mod/file_{f}.py", "excerpt": "def f():\n    pass\n",
+             "start_line_no": 0, "end_line_no": 2, "line_count": 2} for f in files]
+
+
+def legacy_preprocess(points):
+    X, meta = [], []
+    for pt in points:
+        vector, payload = pt["vector"], pt["payload"]
+        X.append(vector)
+        filepath = payload.get("filepath", "")
+        parts = filepath.split("/")
+        meta.append({
+            "id": pt["id"],
+            "filepath": filepath,
+            "dirpath": "/".join(parts[:2]) if len(parts) > 1 else parts[0],
+            "filename": os.path.basename(filepath),
+            "payload": payload,
+            "vector": vector
+        })
+    X = np.array(X)
+    X = X / np.clip(np.linalg.norm(X, axis=1, keepdims=True), 1e-8, None)
+    return X, meta
+
+
+def run_legacy(vectors: np.ndarray, payloads):
+    points = [{"id": i, "payload": p, "vector": v} for i, (v, p) in enumerate(zip(vectors.tolist(), payloads))]
+    return legacy_preprocess(points)
+
+
+def run_columnar(vectors: np.ndarray, payloads):
+    X, meta = preprocess_points(PointSet(range(len(payloads)), vectors.copy(), payloads))
+    labels = np.arange(len(meta)) % 10
+    centroids = np.stack([X[labels == k].mean(axis=0) for k in range(10)])
+    meta_with_cluster, _ = assign_clusters_and_scores(X, meta, labels, centroids)
+    aggregate_chunks_to_files(meta_with_cluster)
+    return X, meta
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--dim", type=int, default=1024)
+    args = parser.parse_args()
+
+    vectors = np.random.default_rng(0).normal(size=(args.points, args.dim)).astype(np.float32)
+    payloads = make_payloads(args.points)
+    print(f"{args.points} points x {args.dim} dims (float32 input {vectors.nbytes / 1e6:.0f} MB)")
+    legacy_s, legacy_mb = measure(run_legacy, vectors, payloads)
+    columnar_s, columnar_mb = measure(run_columnar, vectors, payloads)
+    print(f"legacy dicts:  {legacy_s:6.2f}s  peak {legacy_mb:7.0f} MB")
+    print(f"columnar:      {columnar_s:6.2f}s  peak {columnar_mb:7.0f} MB  (incl. cluster assignment + file nodes)")
+    print(f"speedup {legacy_s / columnar_s:.1f}x, peak memory {legacy_mb / columnar_mb:.1f}x lower")
+
+
+if __name__ == "__main__":
+    import logging
+    logging.disable(logging.INFO)
+    main()
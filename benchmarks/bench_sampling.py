@@ -0,0 +1,70 @@
+"""
+Benchmark the stratified downsampler used by /summarize_repo and /atlas_cluster.
+
+Compares the previous list-based sampler (leftovers built with `pt not in sampled`,
+quadratic in the number of points) with the index-based stratified_sample_indices
+at growing collection sizes, and checks that every file is still represented.
+
+Usage: python -m benchmarks.bench_sampling --sizes 10000,100000,1000000 --sample 1000
+"""
+
+import argparse
+import random
+import time
+from collections import defaultdict
+
+from src.backend.utils.summarization_utils import file_strata, stratified_sample_indices
+
+
+def legacy_downsample(points, n_max):
+    by_file = defaultdict(list)
+    for pt in points:
+        by_file[pt["payload"]["filepath"]].append(pt)
+    quota = max(1, n_max // len(by_file))
+    sampled = []
+    for pts in by_file.values():
+        sampled.extend(pts if len(pts) <= quota else random.sample(pts, quota))
+    if len(sampled) < n_max:
+        leftovers = [pt for pts in by_file.values() for pt in pts if pt not in sampled]
+        sampled.extend(random.sample(leftovers, min(n_max - len(sampled), len(leftovers))))
+    return sampled[:n_max]
+
+
+def make_filepaths(n: int, seed: int = 0):
+    # Skewed file sizes: a few large files, a long tail of small ones, across ~40 directories
+    rng = random.Random(seed)
+    n_files = max(1, n // 50)
+    return [f"pkg{f % 40}/mod/file_{f}.py" for f in (int(n_files * rng.random() ** 3) for _ in range(n))]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="10000,30000,100000,1000000,3000000")
+    parser.add_argument("--sample", type=int, default=1000, help="max_points")
+    parser.add_argument("--legacy-max", type=int, default=30000, help="Skip the legacy sampler above this size")
+    args = parser.parse_args()
+
+    print(f"{'points':>9} {'files':>7} {'legacy s':>9} {'new s':>7} {'weight_by':>9} {'files kept':>10}")
+    for n in (int(s) for s in args.sizes.split(",")):
+        filepaths = make_filepaths(n)
+        n_files = len(set(filepaths))
+
+        legacy = "-"
+        if n <= args.legacy_max:
+            points = [{"id": i, "payload": {"filepath": fp}} for i, fp in enumerate(filepaths)]
+            start = time.perf_counter()
+            legacy_downsample(points, args.sample)
+            legacy = f"{time.perf_counter() - start:.2f}"
+
+        for weight_by in ("file", "size", "dir"):
+            start = time.perf_counter()
+            strata, weights = file_strata(filepaths, weight_by)
+            sample = stratified_sample_indices(strata, args.sample, weights)
+            elapsed = time.perf_counter() - start
+            kept = len(set(strata[sample]))
+            print(f"{n:>9} {n_files:>7} {legacy:>9} {elapsed:>7.2f} {weight_by:>9} {kept:>10}")
+            legacy = ""
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,20 @@
 import os
+import asyncio
 import logging
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from src.backend.qdrant_client import get_qdrant_client
+from src.backend.qdrant_client import get_qdrant_client, get_async_qdrant_client, close_qdrant_clients
+from src.backend.utils.http_utils import close_http_clients
 from src.backend.api.routes import router
 from src.backend.utils.embed_utils import JinaEmbedder
 from src.backend.services.search_service import SearchService
-from src.backend.config import CORS_ORIGINS
+from src.backend.services.job_service import JobManager
+from src.backend.utils.blob_cache import BlobCache
+from src.backend.utils.embedding_cache import EmbeddingCache
+from src.backend.config import (
+    CORS_ORIGINS, BLOB_CACHE_DIR, BLOB_CACHE_MAX_BYTES,
+    EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES
+)
 
 
 logging.basicConfig(
@@ -35,28 +43,45 @@ async def startup_event():
     
     try:
         app.state.qdrant = get_qdrant_client()
-        logger.info("Qdrant client initialized")
+        # Request handlers on the event loop (search, health) use the async client
+        app.state.async_qdrant = get_async_qdrant_client()
+        logger.info("Qdrant clients initialized")
         
         jina_api_key = os.getenv("JINA_API_KEY")
         if not jina_api_key:
             logger.warning("JINA_API_KEY not found in environment variables")
             jina_api_key = "your_api_key_here"
         
-        app.state.jina_embedder = JinaEmbedder(api_key=jina_api_key)
+        app.state.embedding_cache = EmbeddingCache(EMBEDDING_CACHE_PATH, EMBEDDING_CACHE_MAX_BYTES)
+        app.state.jina_embedder = JinaEmbedder(api_key=jina_api_key, cache=app.state.embedding_cache)
+
+        app.state.blob_cache = BlobCache(BLOB_CACHE_DIR, BLOB_CACHE_MAX_BYTES)
+        logger.info(f"Blob cache initialized at {BLOB_CACHE_DIR}")
         
         
         app.state.search_service = SearchService(
-            qdrant=app.state.qdrant,
+            qdrant=app.state.async_qdrant,
             embedder=app.state.jina_embedder,
             repo_id="default"
         )
         
+        # Background load/ingest/summarize jobs; async steps run back on this loop
+        app.state.jobs = JobManager(loop=asyncio.get_running_loop())
+
         logger.info("All services initialized successfully")
         
     except Exception as e:
         logger.error(f"Failed to initialize services: {e}")
         raise
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background jobs and close the shared HTTP and Qdrant connection pools"""
+    if hasattr(app.state, "jobs"):
+        app.state.jobs.shutdown()
+    await close_http_clients()
+    await close_qdrant_clients()
+
 @app.get("/")
 async def root():
     """Root endpoint with API information"""
@@ -67,7 +92,9 @@ async def root():
             "load_repo": "POST /load_repo - Load a GitHub repository",
             "ingest": "POST /ingest - Process and embed loaded repository",
             "search": "POST /search - Search through repository content",
+            "search_batch": "POST /search_batch - Run many searches in one embedding + one Qdrant round-trip",
             "collections": "GET /collections - List Qdrant collections",
+            "jobs": "GET /jobs/{job_id} - Poll a background job (background=true on load_repo/ingest/summarize_repo)",
             "status": "GET /status - Get current system status"
         }
     }
@@ -76,7 +103,7 @@ async def root():
 async def health_check():
     """Health check endpoint"""
     try:
-        collections = app.state.qdrant.get_collections()
+        collections = await app.state.async_qdrant.get_collections()
         
         return {
             "status": "healthy",
@@ -0,0 +1,45 @@
+from typing import Any, Dict, List, Optional, Union
+from pydantic import BaseModel
+
+
+class SearchHit(BaseModel):
+    id: Union[str, int]
+    score: Optional[float] = None
+    payload: Dict[str, Any] = {}
+    # Only filled in when with_vectors=true was requested
+    vector: Optional[Union[List[float], Dict[str, Any]]] = None
+
+
+class SearchResults(BaseModel):
+    points: List[SearchHit]
+    # Pass back as `offset` to get the next page; None on the last page
+    next_offset: Optional[Union[int, str]] = None
+
+
+class SearchResponse(BaseModel):
+    status: str = "success"
+    results: SearchResults
+
+
+class BatchSearchResult(SearchResults):
+    query: str
+
+
+class BatchSearchResponse(BaseModel):
+    status: str = "success"
+    results: List[BatchSearchResult]
+
+
+class ErrorResponse(BaseModel):
+    status: str = "error"
+    message: str
+
+
+def to_hits(points) -> List[SearchHit]:
+    """
+    Convert Qdrant ScoredPoint/Record objects into SearchHit models.
+    """
+    return [
+        SearchHit(id=p.id, score=getattr(p, "score", None), payload=p.payload or {}, vector=p.vector)
+        for p in points
+    ]
@@ -1,44 +1,100 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Union
+import json
 import logging
 from src.backend.services.embedding_service import process_repo
 from src.backend.utils.embed_utils import JinaEmbedder
-from src.backend.utils.file_utils import list_files, get_file_contents
+from src.backend.utils.file_utils import list_files, fetch_file_contents_async, load_repo_archive, load_local_source
+from src.backend.utils.chunking_utils import get_chunking_stats
+from src.backend.utils.chunk_cache import get_chunk_cache
 from src.backend.utils import summarization_utils
+from src.backend.utils import clustering_utils
+from src.backend.utils.http_utils import get_github_client
+from src.backend.config import SEARCH_BATCH_MAX_QUERIES, LOCAL_SOURCE_ROOT
+from src.backend.api.models import (
+    SearchResponse, SearchResults, BatchSearchResponse, BatchSearchResult, ErrorResponse, to_hits
+)
 import os
+import time
+import asyncio
+from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-@router.post("/load_repo")
-async def load_repo(request: Request, repo_id: str, owner: str):
-    logger.info(f"Loading repository {repo_id} for owner {owner}")
+async def _fetch_from_api(repo_id: str, owner: str, blob_cache=None, job=None):
+    # REMOVE Qdrant collection existence check and always fetch files
+    file_list_resp = await asyncio.to_thread(list_files, repo=repo_id, owner=owner)
+    logger.info(f"File list response: Completed")
+    if file_list_resp["status"] != "success":
+        logger.error(f"Failed to list files: {file_list_resp.get('message')}")
+        return {"status": "error", "message": file_list_resp.get("message", "Failed to list files")}
+    file_list = file_list_resp["files"]
+    if job:
+        job.stage("fetching", files_total=len(file_list), files_fetched=0)
+
+    fetch_start = time.perf_counter()
+    results = await fetch_file_contents_async(
+        repo=repo_id, owner=owner, file_paths=file_list,
+        shas=file_list_resp.get("shas"), cache=blob_cache, client=get_github_client(),
+        progress=(lambda done, total: job.progress(files_fetched=done)) if job else None
+    )
+    fetch_elapsed = time.perf_counter() - fetch_start
+
+    all_content = {}
+    failed_files = []
+    for path, result in results.items():
+        if result["status"] == "success":
+            all_content[path] = result["content"]
+        else:
+            failed_files.append(path)
+            logger.warning(f"Failed to get content for {path}: {result.get('message', 'Unknown error')}")
+
+    slowest = sorted(results.items(), key=lambda kv: kv[1]["elapsed"], reverse=True)[:5]
+    timing = {
+        "fetch_seconds": round(fetch_elapsed, 3),
+        "files_per_second": round(len(results) / fetch_elapsed, 2) if fetch_elapsed > 0 else None,
+        "retries": sum(max(r["attempts"] - 1, 0) for r in results.values()),
+        "cache_hits": sum(1 for r in results.values() if r["attempts"] == 0),
+        "slowest_files": [{"path": p, "seconds": round(r["elapsed"], 3)} for p, r in slowest],
+    }
+    logger.info(f"[load_repo] Fetched {len(results)} files in {fetch_elapsed:.2f}s ({timing['retries']} retries)")
+    return {"status": "success", "files": all_content, "failed_files": failed_files, "timing": timing}
+
+
+async def _load_repo(state, repo_id: str, owner: str = None, mode: str = "api", source_path: str = None, job=None):
+    logger.info(f"Loading repository {repo_id} for owner {owner} (mode={mode}, source_path={source_path})")
     try:
-        # REMOVE Qdrant collection existence check and always fetch files
-        file_list_resp = list_files(repo=repo_id, owner=owner)
-        logger.info(f"File list response: Completed")
-        if file_list_resp["status"] != "success":
-            logger.error(f"Failed to list files: {file_list_resp.get('message')}")
-            return {"status": "error", "message": file_list_resp.get("message", "Failed to list files")}
-        file_list = file_list_resp["files"]
-
-        all_content = {}
-        failed_files = []
-        for path in file_list:
-            logger.info(f"Fetching content for file: {path}")
-            result = get_file_contents(repo=repo_id, file_path=path, owner=owner)
-            logger.info(f"Result for {path}: {result['status']}")
-            if result["status"] == "success":
-                all_content[path] = result["content"]
-            else:
-                failed_files.append(path)
-                logger.warning(f"Failed to get content for {path}: {result.get('message', 'Unknown error')}")
-
-        request.app.state.file_contents = all_content
-        request.app.state.repo_id = repo_id
+        load_start = time.perf_counter()
+        if source_path:
+            if job:
+                job.stage("reading")
+            load_resp = await asyncio.to_thread(load_local_source, source_path)
+        elif not owner:
+            return {"status": "error", "message": "owner is required to load a repository from GitHub"}
+        elif mode == "archive":
+            if job:
+                job.stage("downloading")
+            load_resp = await asyncio.to_thread(load_repo_archive, repo=repo_id, owner=owner)
+        else:
+            if job:
+                job.stage("listing")
+            load_resp = await _fetch_from_api(repo_id, owner, getattr(state, "blob_cache", None), job=job)
+
+        if load_resp["status"] != "success":
+            logger.error(f"Failed to load repository: {load_resp.get('message')}")
+            return {"status": "error", "message": load_resp.get("message", "Failed to load repository")}
+        all_content = load_resp["files"]
+        failed_files = load_resp["failed_files"]
+        timing = {"load_seconds": round(time.perf_counter() - load_start, 3), **load_resp.get("timing", {})}
+
+        state.file_contents = all_content
+        state.repo_id = repo_id
 
         logger.info(f"[load_repo] file_contents keys: {list(all_content.keys())[:5]}... total: {len(all_content)}")
-        logger.info(f"[load_repo] request.app.state.file_contents keys: {list(request.app.state.file_contents.keys())[:5]}... total: {len(request.app.state.file_contents)}")
+        logger.info(f"[load_repo] state.file_contents keys: {list(state.file_contents.keys())[:5]}... total: {len(state.file_contents)}")
 
         logger.info(f"Successfully loaded {len(all_content)} files, {len(failed_files)} failed")
         return {
@@ -46,6 +102,7 @@ async def load_repo(request: Request, repo_id: str, owner: str):
             "files_loaded": len(all_content),
             "files_failed": len(failed_files),
             "failed_files": failed_files,
+            "timing": timing,
             "file_contents": all_content
         }
     except Exception as e:
@@ -53,19 +110,74 @@ async def load_repo(request: Request, repo_id: str, owner: str):
         return {"status": "error", "message": str(e)}
 
 
+def _resolve_source_path(source_path: str) -> str:
+    """
+    Resolve a /load_repo source_path (symlinks included) and make sure it lies inside
+    LOCAL_SOURCE_ROOT. Local sources are refused entirely when no root is configured.
+    """
+    if not LOCAL_SOURCE_ROOT:
+        raise HTTPException(status_code=403, detail="Loading local sources is disabled (set LOCAL_SOURCE_ROOT)")
+    root = Path(LOCAL_SOURCE_ROOT).resolve()
+    resolved = (root / source_path).resolve()
+    if not resolved.is_relative_to(root):
+        logger.warning(f"[load_repo] Rejected source_path outside {root}: {source_path}")
+        raise HTTPException(status_code=403, detail="source_path is outside the allowed source root")
+    if not resolved.exists():
+        raise HTTPException(status_code=400, detail="source_path does not exist")
+    return str(resolved)
+
+
+def _submit_job(request: Request, kind: str, repo_id: str, fn):
+    """
+    Queue fn(job) on the app's JobManager and return the job id right away.
+    A job of the same kind already queued or running for the repo is returned instead.
+    """
+    try:
+        job = request.app.state.jobs.submit(kind, repo_id, fn)
+    except RuntimeError as e:
+        return {"status": "error", "message": str(e)}
+    return {"status": "accepted", "job_id": job.id, "job": job.snapshot(include_result=False)}
+
+
+@router.post("/load_repo")
+async def load_repo(request: Request, repo_id: str, owner: str = None, mode: str = "api",
+                    source_path: str = None, background: bool = False):
+    """
+    Load repository files into app state.
+    mode="api" lists the tree and fetches files concurrently through the Contents API;
+    mode="archive" streams the default-branch tarball in a single request.
+    source_path loads a local archive or checkout instead and needs no network access;
+    it is only allowed when LOCAL_SOURCE_ROOT is set, and must lie inside that directory.
+    With background=true a job id is returned immediately; poll /jobs/{job_id}.
+    """
+    if source_path:
+        source_path = _resolve_source_path(source_path)
+    if not background:
+        return await _load_repo(request.app.state, repo_id, owner, mode, source_path)
+
+    jobs = request.app.state.jobs
+
+    def run(job):
+        result = jobs.run_async(_load_repo(request.app.state, repo_id, owner, mode, source_path, job=job))
+        # The files stay in app state; keep them out of the job record
+        result.pop("file_contents", None)
+        return result
+
+    return _submit_job(request, "load", repo_id, run)
+
+
 from fastapi import Body
 
 @router.post("/ingest")
 async def ingest_repo(
     request: Request,
     repo_id: str = Body(...),
-    file_contents: dict = Body(None)
+    file_contents: dict = Body(None),
+    incremental: bool = Body(False),
+    background: bool = Body(False)
 ):
-    client = request.app.state.qdrant
-    collection_name = f"repo_{repo_id}"
-    if collection_name in [c.name for c in client.get_collections().collections]:
-        client.delete_collection(collection_name=collection_name)
-    # Now proceed with ingest
+    # Full re-ingests build a new collection version and swap the repo_{id} alias onto it,
+    # so the repo stays searchable on the previous index while it is rebuilt
     logger.info(f"Starting repository ingestion for repo_id={repo_id}")
 
     # Prefer file_contents from body, fallback to app.state
@@ -84,17 +196,49 @@ async def ingest_repo(
         return {"status": "error", "message": "No repo loaded. Please call /load_repo first or provide file_contents."}
 
     logger.info(f"Ingesting {len(file_contents)} files for repo {repo_id}")
+    embedder = request.app.state.jina_embedder
+    if background:
+        return _submit_job(request, "ingest", repo_id,
+                           lambda job: _ingest(file_contents, repo_id, embedder, incremental, job=job))
+    # Chunking, embedding and upserting block; run them off the event loop
+    return await asyncio.to_thread(_ingest, file_contents, repo_id, embedder, incremental)
+
 
+def _ingest(file_contents: dict, repo_id: str, embedder, incremental: bool, job=None):
     try:
-        embedder = request.app.state.jina_embedder
-        result = process_repo(file_contents, repo_id, embedder)
-        return {"status": "success", "message": "Ingestion complete.", "chunks_processed": result.get("chunks_processed", 0)}
+        if job:
+            job.stage("ingesting", files_total=len(file_contents))
+        result = process_repo(file_contents, repo_id, embedder, incremental=incremental,
+                              progress=(lambda stats: job.progress(**stats)) if job else None)
+        response = {"status": "success", "message": "Ingestion complete.", "chunks_processed": result.get("chunks_processed", 0)}
+        if result.get("files_deleted"):
+            response["files_deleted"] = result["files_deleted"]
+        if result.get("file_diff") is not None:
+            response["files"] = {k: len(v) for k, v in result["file_diff"].items()}
+        if result.get("point_diff") is not None:
+            response["points"] = result["point_diff"]
+            response["collection_version"] = result.get("collection_version")
+        if result.get("points_clustered"):
+            response["points_clustered"] = result["points_clustered"]
+        return response
     except Exception as e:
         return {"status": "error", "message": f"Ingestion failed: {str(e)}"}
 
 
-@router.post("/search")
-async def search(request: Request, query: str, file_path: str = None):
+def _parse_fields(fields: str = None):
+    # "filepath,excerpt" -> ["filepath", "excerpt"]; None/"" -> full payload
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+
+
+@router.post("/search", response_model=Union[SearchResponse, ErrorResponse])
+async def search(request: Request, query: str, file_path: str = None, limit: int = 10,
+                 offset: Union[int, str, None] = None, with_vectors: bool = False, fields: str = None):
+    """
+    Semantic search over the loaded repo. Vectors are omitted unless with_vectors=true,
+    `fields` (comma separated) selects payload keys, and limit/offset page through the
+    hits: pass the returned results.next_offset to get the next page. With a query the
+    offset is a hit count; without one it is the scroll cursor, a point id (UUID).
+    """
     logger.info(f"Performing search with query: '{query}'")
     
     try:
@@ -105,25 +249,100 @@ async def search(request: Request, query: str, file_path: str = None):
             logger.error("No repo_id found for search")
             return {"status": "error", "message": "No repository loaded. Please load a repository first."}
 
-        results = search_service.semantic_search(
+        points, next_offset = await search_service.semantic_search(
             query=query,
             repo_id=repo_id,
-            file_path=file_path
+            file_path=file_path,
+            n_max=limit,
+            offset=offset,
+            with_vectors=with_vectors,
+            payload_fields=_parse_fields(fields)
         )
         
-        logger.info(f"Search completed, found {len(results.points) if hasattr(results, 'points') else 'unknown'} results")
-        return {"status": "success", "results": results}
+        logger.info(f"Search completed, found {len(points)} results")
+        return SearchResponse(results=SearchResults(points=to_hits(points), next_offset=next_offset))
     except Exception as e:
         logger.error(f"Search failed: {str(e)}")
         return {"status": "error", "message": f"Search failed: {str(e)}"}
 
 
+@router.post("/search_batch", response_model=Union[BatchSearchResponse, ErrorResponse])
+async def search_batch(
+    request: Request,
+    queries: list = Body(...),
+    repo_id: str = Body(None),
+    file_path: str = Body(None),
+    limit: int = Body(10),
+    with_vectors: bool = Body(False),
+    fields: str = Body(None)
+):
+    """
+    Run many searches at once: all queries are embedded in one request and searched in
+    one Qdrant batch call. `queries` holds strings or {"query", "file_path", "limit"}
+    objects; results come back per query, in order.
+    """
+    repo_id = repo_id or getattr(request.app.state, "repo_id", None)
+    if not repo_id:
+        return {"status": "error", "message": "No repository loaded. Please load a repository first."}
+    if not queries or len(queries) > SEARCH_BATCH_MAX_QUERIES:
+        return {"status": "error", "message": f"Provide between 1 and {SEARCH_BATCH_MAX_QUERIES} queries."}
+    texts = [q.get("query") if isinstance(q, dict) else q for q in queries]
+    if not all(isinstance(t, str) and t.strip() for t in texts):
+        return {"status": "error", "message": "Every query must be a non-empty string."}
+
+    logger.info(f"[search_batch] {len(queries)} queries for repo {repo_id}")
+    try:
+        responses = await request.app.state.search_service.batch_search(
+            queries, repo_id=repo_id, file_path=file_path, n_max=limit,
+            with_vectors=with_vectors, payload_fields=_parse_fields(fields)
+        )
+        return BatchSearchResponse(results=[
+            BatchSearchResult(query=text, points=to_hits(response.points))
+            for text, response in zip(texts, responses)
+        ])
+    except Exception as e:
+        logger.error(f"[search_batch] Search failed: {str(e)}")
+        return {"status": "error", "message": f"Search failed: {str(e)}"}
+
+
+@router.get("/jobs")
+def list_jobs(request: Request, repo_id: str = None):
+    jobs = request.app.state.jobs.list(repo_id=repo_id)
+    return {"status": "success", "jobs": [job.snapshot(include_result=False) for job in jobs]}
+
+
+@router.get("/jobs/{job_id}")
+def get_job(request: Request, job_id: str):
+    """Status, per-stage progress, timing and throughput of a background job (and its result once done)."""
+    job = request.app.state.jobs.get(job_id)
+    if job is None:
+        return {"status": "error", "message": f"Unknown job {job_id}"}
+    return {"status": "success", "job": job.snapshot()}
+
+
+@router.get("/jobs/{job_id}/events")
+async def job_events(request: Request, job_id: str):
+    """Server-sent events: one job snapshot per change, ending when the job finishes."""
+    jobs = request.app.state.jobs
+    if jobs.get(job_id) is None:
+        return {"status": "error", "message": f"Unknown job {job_id}"}
+
+    async def stream():
+        async for snapshot in jobs.watch(job_id):
+            if await request.is_disconnected():
+                return
+            yield f"data: {json.dumps(snapshot, default=str)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
 @router.get("/collections")
 def list_collections(request: Request):
     try:
         client = request.app.state.qdrant
         collections = client.get_collections()
-        return {"status": "success", "collections": collections}
+        aliases = client.get_aliases()
+        return {"status": "success", "collections": collections, "aliases": aliases}
     except Exception as e:
         return {"status": "error", "message": f"Failed to list collections: {str(e)}"}
 
@@ -133,6 +352,11 @@ def get_status(request: Request):
     """Get the current status of the loaded repository and services"""
     repo_id = getattr(request.app.state, "repo_id", None)
     file_contents = getattr(request.app.state, "file_contents", None)
+    blob_cache = getattr(request.app.state, "blob_cache", None)
+    embedder = getattr(request.app.state, "jina_embedder", None)
+    search_service = getattr(request.app.state, "search_service", None)
+    embedding_cache = getattr(embedder, "cache", None)
+    chunk_cache = get_chunk_cache()
     
     return {
         "status": "success",
@@ -143,76 +367,120 @@ def get_status(request: Request):
             "qdrant": hasattr(request.app.state, "qdrant"),
             "embedder": hasattr(request.app.state, "jina_embedder"),
             "search_service": hasattr(request.app.state, "search_service")
-        }
+        },
+        "embedding_dim": getattr(embedder, "dimensions", None),
+        "query_cache": search_service.query_cache.stats() if search_service else None,
+        "chunking": get_chunking_stats(),
+        "chunk_cache": chunk_cache.stats() if chunk_cache else None,
+        "blob_cache": blob_cache.stats() if blob_cache else None,
+        "embedding_cache": {
+            **embedding_cache.stats(),
+            "estimated_tokens_saved": embedder.tokens_saved
+        } if embedding_cache else None
     }
     
 
+# Summarization and atlas handlers are plain `def`s: their Qdrant scrolls, KMeans,
+# similarity graphs and Gemini calls all block, so FastAPI runs them in its threadpool
+# instead of on the event loop that serves /search.
 @router.post("/summarize_repo")
-async def summarize_repo(
+def summarize_repo(
     request: Request, 
     repo_id: str, 
     max_points: int = 1000, 
-    cluster_k: int = 10, 
+    cluster_k: Union[int, str] = 10, 
     reps_per_cluster: int = 3, 
-    max_snippets: int = 5
+    max_snippets: int = 5,
+    background: bool = False
 ):
     """
     Summarize the repository and its contents.
     Improved logging and error handling for easier debugging.
+    cluster_k=auto picks the number of clusters from the data (cached per repo version).
+    With background=true a job id is returned immediately; poll /jobs/{job_id}.
     """
     logger.info(f"[summarize_repo] Called for repo_id={repo_id}")
 
-    client = request.app.state.qdrant
-    collection_name = f"repo_{repo_id}"
     gemini_key = os.getenv("GOOGLE_API_KEY", "")
     if not gemini_key:
         logger.warning("[summarize_repo] GOOGLE_API_KEY not set. Summarization may fail if required.")
         raise RuntimeError("GOOGLE_API_KEY environment variable is not set.")
 
+    state = request.app.state
+    if background:
+        return _submit_job(request, "summarize", repo_id, lambda job: _summarize_repo(
+            state, repo_id, gemini_key, max_points, cluster_k, reps_per_cluster, max_snippets, job=job
+        ))
+    return _summarize_repo(state, repo_id, gemini_key, max_points, cluster_k, reps_per_cluster, max_snippets)
+
+
+def _resolve_cluster_k(state, repo_id: str, content_hash: str, X, cluster_k):
+    """
+    Fixed cluster_k, or for "auto" the k chosen by select_k, cached per (repo, content hash).
+    Returns (k, selection or None).
+    """
+    k = clustering_utils.parse_cluster_k(cluster_k)
+    if k is not None:
+        return k, None
+    if not hasattr(state, "auto_k_cache"):
+        state.auto_k_cache = {}
+    cache_key = (repo_id, content_hash)
+    if cache_key not in state.auto_k_cache:
+        state.auto_k_cache[cache_key] = clustering_utils.select_k(X)
+    else:
+        logger.info(f"[resolve_cluster_k] Using cached k for {repo_id} version {content_hash}")
+    selection = state.auto_k_cache[cache_key]
+    return selection["k"], selection
+
+
+def _summarize_repo(state, repo_id: str, gemini_key: str, max_points: int, cluster_k,
+                    reps_per_cluster: int, max_snippets: int, job=None):
+    client = state.qdrant
+    collection_name = f"repo_{repo_id}"
+
     # Defensive initialization
     repo_metrics = {}
     repo_summary = {}
     cluster_summaries = []
 
-    if not hasattr(request.app.state, "atlas_cache"):
-        request.app.state.atlas_cache = {}
-    if not hasattr(request.app.state, "file_nodes_cache"):
-        request.app.state.file_nodes_cache = {}
+    if not hasattr(state, "atlas_cache"):
+        state.atlas_cache = {}
+    if not hasattr(state, "file_nodes_cache"):
+        state.file_nodes_cache = {}
 
     try:
         logger.info(f"[summarize_repo] Attempting to fetch points from Qdrant collection: {collection_name}")
-        # Check if collection exists
-        collections = client.get_collections()
-        collection_names = [c.name for c in getattr(collections, "collections", [])]
-        if collection_name not in collection_names:
-            logger.error(f"[summarize_repo] Qdrant collection '{collection_name}' does not exist. Available: {collection_names}")
+        if job:
+            job.stage("fetching_points")
+        # Check if collection exists (repo_{id} is normally an alias, which get_collections does not list)
+        if not client.collection_exists(collection_name=collection_name):
+            logger.error(f"[summarize_repo] Qdrant collection '{collection_name}' does not exist.")
             raise RuntimeError(f"Qdrant collection '{collection_name}' does not exist. Did ingestion succeed?")
 
-        points, _ = client.scroll(collection_name=collection_name, limit=max_points, with_vectors=True)
-        logger.info(f"[summarize_repo] Retrieved {len(points)} points from Qdrant.")
-        for i, pt in enumerate(points[:5]):
-            logger.info(f"[summarize_repo] Point {i} vector type: {type(getattr(pt, 'vector', None))} length: {len(getattr(pt, 'vector', []) or [])}")
+        # Pages through the whole collection and downsamples over all of it
+        sampled, total_points, content_hash = summarization_utils.load_points_for_clustering(
+            client, collection_name, max_points,
+            progress=(lambda done, total: job.progress(points_read=done, points_total=total)) if job else None
+        )
+        logger.info(f"[summarize_repo] Read {total_points} points from Qdrant, sampled {len(sampled)}.")
 
-        if not points:
+        if not total_points:
             logger.error(f"[summarize_repo] No points found in collection '{collection_name}'.")
             raise RuntimeError(f"No points found in Qdrant collection '{collection_name}'.")
 
-        content_hash = summarization_utils.compute_content_hash(points)
         cache_key = (repo_id, content_hash)
 
-        if not hasattr(request.app.state, "summarization_cache"):
-            cache = request.app.state.summarization_cache = {}
+        if not hasattr(state, "summarization_cache"):
+            cache = state.summarization_cache = {}
         else:
-            cache = request.app.state.summarization_cache
+            cache = state.summarization_cache
 
         if cache_key in cache:
             logger.info(f"[summarize_repo] Returning cached summary for {repo_id} version {content_hash}")
             return cache[cache_key]
 
-        logger.info(f"[summarize_repo] Downsampling points for clustering...")
-        sampled = summarization_utils.stratified_downsample(points, n_max=max_points)
-        logger.info(f"[summarize_repo] Sampled {len(sampled)} points.")
-
+        if job:
+            job.stage("clustering", points=len(sampled))
         X, meta = summarization_utils.preprocess_points(sampled)
         logger.info(f"[summarize_repo] Preprocessed points. X shape: {X.shape}, meta count: {len(meta)}")
         
@@ -226,39 +494,50 @@ async def summarize_repo(
                 "error": "No valid points for summarization after preprocessing."
             }
             
-        labels, centroids = summarization_utils.run_kmeans(X, n_clusters=cluster_k)
-        logger.info(f"[summarize_repo] Ran KMeans clustering. Labels: {set(labels)}, Centroids shape: {centroids.shape}")
+        k, _ = _resolve_cluster_k(state, repo_id, content_hash, X, cluster_k)
+        if job:
+            job.progress(cluster_k=k)
+        labels, centroids, engine = clustering_utils.cluster_points(X, n_clusters=k, repo_id=repo_id)
+        logger.info(f"[summarize_repo] Ran {engine.info['method']} clustering. Labels: {set(labels)}, Centroids shape: {centroids.shape}")
 
         meta_with_cluster, clusters = summarization_utils.assign_clusters_and_scores(X, meta, labels, centroids)
         logger.info(f"[summarize_repo] Assigned clusters and scores.")
-        request.app.state.atlas_cache[repo_id] = meta_with_cluster
+        state.atlas_cache[repo_id] = meta_with_cluster
 
         cluster_labels = summarization_utils.get_clusters_and_labels(meta_with_cluster, clusters, n_labels=reps_per_cluster)
         logger.info(f"[summarize_repo] Built cluster labels.")
 
         cluster_summaries = []
+        if job:
+            job.stage("summarizing_clusters", clusters_total=len(cluster_labels), clusters_summarized=0)
         for cluster_id, info in cluster_labels.items():
             logger.info(f"[summarize_repo] Summarizing cluster {cluster_id}...")
             summary = summarization_utils.summarize_cluster(info, repo_id=repo_id, api_key=gemini_key)
             cluster_summaries.append(summary)
+            if job:
+                job.progress(clusters_summarized=len(cluster_summaries))
 
         repo_metrics = {
-            "points": len(points),
+            "points": total_points,
             "clusters": len(clusters),
-            "files": len({m["filepath"] for m in meta}),
-            "top_dirs": list({m["dirpath"] for m in meta})[:5]
+            "files": meta.n_files,
+            "top_dirs": meta.dirpaths[:5]
         }
         logger.info(f"[summarize_repo] Repo metrics: {repo_metrics}")
 
+        if job:
+            job.stage("summarizing_repo")
         repo_summary = summarization_utils.summarize_repo(cluster_summaries, repo_metrics=repo_metrics)
         logger.info(f"[summarize_repo] Repo summary generated.")
 
+        if job:
+            job.stage("persisting")
         summarization_utils.clusters_to_qdrant(client, collection_name=collection_name, meta_with_cluster=meta_with_cluster)
         logger.info(f"[summarize_repo] Persisted cluster IDs to Qdrant.")
 
         # Build and store file-level nodes
         file_nodes = summarization_utils.aggregate_chunks_to_files(meta_with_cluster)
-        request.app.state.file_nodes_cache[repo_id] = file_nodes
+        state.file_nodes_cache[repo_id] = file_nodes
 
         cache[cache_key] = {
             "repo_id": repo_id,
@@ -280,36 +559,40 @@ async def summarize_repo(
         }
 
 @router.post("/atlas_cluster")
-async def atlas_cluster(
+def atlas_cluster(
     request: Request,
     repo_id: str,
     max_points: int = 1000,
-    cluster_k: int = 10
+    cluster_k: Union[int, str] = 10
 ):
     """
     Cluster repo points and cache for Atlas, without running LLM summarization.
+    cluster_k=auto picks the number of clusters from the data (cached per repo version).
     """
     logger.info(f"[atlas_cluster] Clustering for repo {repo_id}")
     client = request.app.state.qdrant
     collection_name = f"repo_{repo_id}"
 
-    collections = client.get_collections()
-    collection_names = [c.name for c in getattr(collections, "collections", [])]
-    if collection_name not in collection_names:
+    if not client.collection_exists(collection_name=collection_name):
         logger.error(f"[atlas_cluster] Qdrant collection '{collection_name}' does not exist.")
         return {"status": "error", "message": f"Qdrant collection '{collection_name}' does not exist."}
 
-    points, _ = client.scroll(collection_name=collection_name, limit=max_points, with_vectors=True)
+    points, total_points, content_hash = summarization_utils.load_points_for_clustering(client, collection_name, max_points)
     if not points:
         logger.error(f"[atlas_cluster] No points found in collection '{collection_name}'.")
         return {"status": "error", "message": f"No points found in Qdrant collection '{collection_name}'."}
+    logger.info(f"[atlas_cluster] Sampled {len(points)} of {total_points} points")
 
     X, meta = summarization_utils.preprocess_points(points)
     if X.size == 0 or len(meta) == 0:
         logger.error(f"[atlas_cluster] No valid points after preprocessing.")
         return {"status": "error", "message": "No valid points for clustering."}
 
-    labels, centroids = summarization_utils.run_kmeans(X, n_clusters=cluster_k)
+    try:
+        k, selection = _resolve_cluster_k(request.app.state, repo_id, content_hash, X, cluster_k)
+    except ValueError as e:
+        return {"status": "error", "message": str(e)}
+    labels, centroids, engine = clustering_utils.cluster_points(X, n_clusters=k, repo_id=repo_id)
     meta_with_cluster, clusters = summarization_utils.assign_clusters_and_scores(X, meta, labels, centroids)
 
     if not hasattr(request.app.state, "atlas_cache"):
@@ -317,11 +600,13 @@ async def atlas_cluster(
     request.app.state.atlas_cache[repo_id] = meta_with_cluster
 
     logger.info(f"[atlas_cluster] Cached cluster assignments for repo {repo_id}")
-    return {"status": "success", "message": "Cluster assignments cached for Atlas."}
+    return {"status": "success", "message": "Cluster assignments cached for Atlas.",
+            "clustering": {**engine.info, "clusters": len(centroids), "inertia": engine.inertia,
+                           "k_selection": selection}}
 
 
 @router.post("/atlas_pack")
-async def atlas_pack(
+def atlas_pack(
     request: Request,
     repo_id: str,
     similarity_threshold: float = 0.7,
@@ -362,7 +647,7 @@ async def atlas_pack(
         return {"status": "error", "message": str(e)}
 
 @router.post("/file_atlas")
-async def file_atlas(
+def file_atlas(
     request: Request,
     repo_id: str = Body(...),
     filepath: str = Body(...),
@@ -376,7 +661,7 @@ async def file_atlas(
         logger.warning(f"[file_atlas] No cached chunk-level meta for repo {repo_id}")
         return {"status": "error", "message": "No cached chunk-level meta. Run /summarize_repo first."}
     # Only use chunk-level meta for the chunk Atlas
-    file_chunks = [m for m in meta_with_cluster if m["filepath"] == filepath]
+    file_chunks = meta_with_cluster.for_file(filepath)
     logger.info(f"[file_atlas] Found {len(file_chunks)} chunks for file {filepath}")
     if not file_chunks:
         logger.warning(f"[file_atlas] No chunks found for file {filepath}")
@@ -72,8 +72,109 @@ LANGUAGE_CONFIGS = {
     }
 }
 
+# Worker processes for AST chunking: 1 = serial in the request thread, 0 = one per CPU
+CHUNK_WORKERS = int(os.getenv("CHUNK_WORKERS", "1"))
+
 # Jina embedding API configuration
-JINA_API_URL = 'https://api.jina.ai/v1/embeddings'
+JINA_API_URL = os.getenv("JINA_API_URL", 'https://api.jina.ai/v1/embeddings')
 JINA_HEADERS = {
     'Content-Type': 'application/json',
-}
\ No newline at end of file
+}
+# Output width of jina-embeddings-v3 (Matryoshka: 32, 64, 128, 256, 512, 768 or 1024).
+# Also the vector size of new collections; smaller vectors trade a little recall for
+# less RAM and faster search/clustering (see benchmarks/bench_dimensions.py)
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "1024"))
+# In-memory LRU+TTL cache of query embeddings used by SearchService (0 disables it)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+# Max queries accepted by one /search_batch call
+SEARCH_BATCH_MAX_QUERIES = int(os.getenv("SEARCH_BATCH_MAX_QUERIES", "64"))
+# embed_chunks splits its input into requests of at most this many chunks / estimated tokens
+JINA_BATCH_SIZE = int(os.getenv("JINA_BATCH_SIZE", "128"))
+JINA_MAX_BATCH_TOKENS = int(os.getenv("JINA_MAX_BATCH_TOKENS", "32000"))
+JINA_MAX_WORKERS = int(os.getenv("JINA_MAX_WORKERS", "4"))
+JINA_MAX_RETRIES = int(os.getenv("JINA_MAX_RETRIES", "4"))
+JINA_TIMEOUT = float(os.getenv("JINA_TIMEOUT", "60"))
+
+# Qdrant bulk upserts: points per request, concurrent upload threads, retries per batch.
+# QDRANT_UPSERT_WAIT=false returns before points are indexed (faster, eventually consistent)
+QDRANT_UPSERT_BATCH_SIZE = int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256"))
+QDRANT_UPSERT_PARALLEL = int(os.getenv("QDRANT_UPSERT_PARALLEL", "4"))
+QDRANT_UPSERT_WAIT = os.getenv("QDRANT_UPSERT_WAIT", "true").lower() in ("1", "true", "yes")
+QDRANT_UPSERT_MAX_RETRIES = int(os.getenv("QDRANT_UPSERT_MAX_RETRIES", "3"))
+# Points per scroll request when reading whole collections (summaries, clustering)
+QDRANT_SCROLL_PAGE_SIZE = int(os.getenv("QDRANT_SCROLL_PAGE_SIZE", "1000"))
+# Full ingests build repo_{id}__v{timestamp} and swap the repo_{id} alias onto it;
+# this many superseded versions are kept around (for rollback) before being deleted
+QDRANT_KEEP_OLD_VERSIONS = int(os.getenv("QDRANT_KEEP_OLD_VERSIONS", "0"))
+# Collection provisioning (applied when a collection version is created).
+# QDRANT_QUANTIZATION: none | scalar (int8, ~4x smaller) | product (QDRANT_PQ_COMPRESSION, e.g. x16).
+# With QDRANT_ON_DISK_VECTORS the full vectors live on disk and only the quantized copy
+# (kept in RAM when QDRANT_QUANTIZATION_ALWAYS_RAM) is used for the HNSW search.
+QDRANT_HNSW_M = int(os.getenv("QDRANT_HNSW_M", "16"))
+QDRANT_HNSW_EF_CONSTRUCT = int(os.getenv("QDRANT_HNSW_EF_CONSTRUCT", "100"))
+QDRANT_QUANTIZATION = os.getenv("QDRANT_QUANTIZATION", "none").lower()
+QDRANT_PQ_COMPRESSION = os.getenv("QDRANT_PQ_COMPRESSION", "x16").lower()
+QDRANT_QUANTIZATION_ALWAYS_RAM = os.getenv("QDRANT_QUANTIZATION_ALWAYS_RAM", "true").lower() in ("1", "true", "yes")
+QDRANT_ON_DISK_VECTORS = os.getenv("QDRANT_ON_DISK_VECTORS", "false").lower() in ("1", "true", "yes")
+QDRANT_ON_DISK_PAYLOAD = os.getenv("QDRANT_ON_DISK_PAYLOAD", "false").lower() in ("1", "true", "yes")
+
+# Qdrant server and the process-wide HTTP connection pools (see utils/http_utils.py)
+QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
+QDRANT_PORT = int(os.getenv("QDRANT_PORT", "6333"))
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "32"))
+
+# Background jobs (background=true on /load_repo, /ingest, /summarize_repo): worker
+# threads, max jobs waiting for a worker, finished jobs kept for status polling
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "16"))
+JOB_HISTORY = int(os.getenv("JOB_HISTORY", "100"))
+
+# Summarization/atlas downsampling: how files are weighted when sampling max_points
+# (file = equal per file, size = by chunk count, dir = equal per top directory) and the
+# RNG seed, so the same collection always yields the same sample
+SAMPLE_WEIGHT_BY = os.getenv("SAMPLE_WEIGHT_BY", "file").lower()
+SAMPLE_SEED = int(os.getenv("SAMPLE_SEED", "42"))
+
+# Clustering engine for /summarize_repo and /atlas_cluster: kmeans, minibatch (MiniBatchKMeans)
+# or auto (minibatch from CLUSTER_MINIBATCH_THRESHOLD points). Fitted centroids are kept per
+# repo in CENTROID_CACHE_DIR to warm-start the next fit and absorb incremental ingests
+CLUSTER_METHOD = os.getenv("CLUSTER_METHOD", "auto").lower()
+CLUSTER_MINIBATCH_THRESHOLD = int(os.getenv("CLUSTER_MINIBATCH_THRESHOLD", "5000"))
+CLUSTER_BATCH_SIZE = int(os.getenv("CLUSTER_BATCH_SIZE", "1024"))
+CENTROID_CACHE_DIR = os.getenv("CENTROID_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "repo_analyzer", "centroids"))
+# cluster_k=auto: candidate k from CLUSTER_AUTO_MIN_K up to CLUSTER_AUTO_MAX_K (and ~sqrt(n/2)),
+# each scored by silhouette on a CLUSTER_AUTO_SAMPLE-point subsample, CLUSTER_AUTO_WORKERS at a time
+CLUSTER_AUTO_MIN_K = int(os.getenv("CLUSTER_AUTO_MIN_K", "2"))
+CLUSTER_AUTO_MAX_K = int(os.getenv("CLUSTER_AUTO_MAX_K", "30"))
+CLUSTER_AUTO_SAMPLE = int(os.getenv("CLUSTER_AUTO_SAMPLE", "2000"))
+CLUSTER_AUTO_WORKERS = int(os.getenv("CLUSTER_AUTO_WORKERS", "4"))
+
+# Max batches buffered between the chunk -> embed -> upsert stages of an ingest
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "4"))
+
+# GitHub API configuration
+GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
+PROJECT_ID = os.getenv("PROJECT_ID")
+# Override to point the loader at a GitHub Enterprise host or a local stub server
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com")
+# Max number of file fetches in flight at once during /load_repo
+GITHUB_FETCH_CONCURRENCY = int(os.getenv("GITHUB_FETCH_CONCURRENCY", "32"))
+GITHUB_FETCH_TIMEOUT = float(os.getenv("GITHUB_FETCH_TIMEOUT", "30"))
+GITHUB_FETCH_MAX_RETRIES = int(os.getenv("GITHUB_FETCH_MAX_RETRIES", "5"))
+
+# /load_repo?source_path=... reads a local archive or checkout on the server. Disabled
+# unless LOCAL_SOURCE_ROOT is set; source paths must then resolve to inside that directory
+LOCAL_SOURCE_ROOT = os.getenv("LOCAL_SOURCE_ROOT")
+
+# On-disk cache of fetched file contents, keyed by git blob SHA
+BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "repo_analyzer", "blobs"))
+BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# On-disk cache of embedding vectors keyed by (model, task, sha256(text))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "repo_analyzer", "embeddings.sqlite3"))
+EMBEDDING_CACHE_MAX_BYTES = int(os.getenv("EMBEDDING_CACHE_MAX_BYTES", str(1024 * 1024 * 1024)))
+
+# On-disk cache of chunkify output keyed by file hash, language, chunk config and astchunk version
+CHUNK_CACHE_PATH = os.getenv("CHUNK_CACHE_PATH", os.path.join(os.path.expanduser("~"), ".cache", "repo_analyzer", "chunks.sqlite3"))
+CHUNK_CACHE_MAX_BYTES = int(os.getenv("CHUNK_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
@@ -1,16 +1,38 @@
-from qdrant_client import QdrantClient
+from qdrant_client import QdrantClient, AsyncQdrantClient
+from src.backend.config import QDRANT_HOST, QDRANT_PORT
 
-_qdrant_client = None 
+_qdrant_client = None
+_async_qdrant_client = None
 
 def get_qdrant_client():
     global _qdrant_client
     if _qdrant_client is None:
         _qdrant_client = QdrantClient(
-            host="localhost",
-            port=6333
+            host=QDRANT_HOST,
+            port=QDRANT_PORT
         )
     return _qdrant_client
 
+def get_async_qdrant_client():
+    """
+    Shared AsyncQdrantClient for request handlers, so Qdrant calls do not block the event loop.
+    """
+    global _async_qdrant_client
+    if _async_qdrant_client is None:
+        _async_qdrant_client = AsyncQdrantClient(
+            host=QDRANT_HOST,
+            port=QDRANT_PORT
+        )
+    return _async_qdrant_client
+
+async def close_qdrant_clients():
+    global _qdrant_client, _async_qdrant_client
+    if _async_qdrant_client is not None:
+        await _async_qdrant_client.close()
+    if _qdrant_client is not None:
+        _qdrant_client.close()
+    _qdrant_client = _async_qdrant_client = None
+
 def get_collections():
     client = get_qdrant_client()
     return client.get_collections()
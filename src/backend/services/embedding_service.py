@@ -1,43 +1,343 @@
 import logging
-from src.backend.utils.chunking_utils import chunk_repo
+import queue
+import threading
+from typing import Callable, Optional
+from qdrant_client.models import Filter, FieldCondition, MatchAny, FilterSelector, PointIdsList
+from src.backend.utils.chunking_utils import iter_chunk_repo, compute_file_hash
+from src.backend.utils.qdrant_utils import (
+    QdrantBulkWriter, ensure_collection, get_vector_size, list_point_ids, versioned_collection_name, swap_alias, gc_collection_versions
+)
+from src.backend.utils.clustering_utils import absorb_points
+from src.backend.config import INGEST_QUEUE_SIZE
 
 logger = logging.getLogger(__name__)
 
-def process_repo(file_contents: dict, repo_id: str, embedder):
-    from src.backend.qdrant_client import get_qdrant_client
-    logger = logging.getLogger(__name__)
+def get_indexed_file_hashes(client, collection_name: str, page_size: int = 1000) -> dict:
+    """
+    Page through a collection's payloads (no vectors) and return filepath -> file_hash.
+    Files ingested before hashes were stored map to None and are always treated as changed.
+    """
+    file_hashes = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=["filepath", "file_hash"],
+            with_vectors=False
+        )
+        for pt in points:
+            payload = pt.payload or {}
+            file_hashes[payload.get("filepath")] = payload.get("file_hash")
+        if offset is None:
+            return file_hashes
 
-    chunks = chunk_repo(file_contents)
-    for chunk in chunks[:5]:
-        print(f"[process_repo] Sample chunk metadata: {chunk.get('metadata', {})}")
 
-    logger.info(f"[process_repo] Chunked {len(file_contents)} files into {len(chunks)} chunks for repo {repo_id}")
+def diff_file_hashes(file_contents: dict, indexed_hashes: dict) -> dict:
+    """
+    Compare the files to ingest with what is already indexed.
+    Returns lists of added, changed, removed and unchanged file paths.
+    """
+    added, changed, unchanged = [], [], []
+    for path, content in file_contents.items():
+        if path not in indexed_hashes:
+            added.append(path)
+        elif indexed_hashes[path] != compute_file_hash(content or ""):
+            changed.append(path)
+        else:
+            unchanged.append(path)
+    removed = [path for path in indexed_hashes if path not in file_contents]
+    return {"added": added, "changed": changed, "removed": removed, "unchanged": unchanged}
 
-    if not chunks:
-        logger.warning(f"[process_repo] No chunks generated for repo {repo_id}")
-        return {"chunks_processed": 0, "message": "No chunks generated"}
+
+def delete_file_points(client, collection_name: str, file_paths: list, batch_size: int = 500,
+                       keep_ids: Optional[set] = None):
+    """
+    Delete every point whose payload filepath is in file_paths. Points whose id (as a
+    string) is in `keep_ids` are left alone, so the stale points of a re-ingested file
+    can be removed after its new points were written.
+    """
+    for i in range(0, len(file_paths), batch_size):
+        file_filter = Filter(must=[FieldCondition(key="filepath", match=MatchAny(any=file_paths[i:i + batch_size]))])
+        if not keep_ids:
+            client.delete(collection_name=collection_name, points_selector=FilterSelector(filter=file_filter))
+            continue
+        offset = None
+        while True:
+            points, offset = client.scroll(
+                collection_name=collection_name,
+                scroll_filter=file_filter,
+                limit=batch_size,
+                offset=offset,
+                with_payload=False,
+                with_vectors=False
+            )
+            stale_ids = [pt.id for pt in points if str(pt.id) not in keep_ids]
+            if stale_ids:
+                client.delete(collection_name=collection_name, points_selector=PointIdsList(points=stale_ids))
+            if offset is None:
+                break
+
+def _put(q: queue.Queue, item, failed: threading.Event) -> bool:
+    # Block while the queue is full, but give up once another stage has failed
+    while not failed.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def _get(q: queue.Queue, failed: threading.Event):
+    while not failed.is_set():
+        try:
+            return q.get(timeout=0.1)
+        except queue.Empty:
+            continue
+    return None
+
+
+def stream_ingest(file_contents: dict, repo_id: str, embedder, client, collection_name: str,
+                  progress: Optional[Callable[[dict], None]] = None,
+                  batch_size: Optional[int] = None,
+                  embed_workers: Optional[int] = None,
+                  queue_size: int = INGEST_QUEUE_SIZE,
+                  point_ids: Optional[set] = None) -> dict:
+    """
+    Run chunking, embedding and upserting as overlapping stages connected by bounded
+    queues, so at most a few batches of chunks/vectors are in memory at any time.
+    One thread chunks files, `embed_workers` threads embed batches and one thread
+    upserts them. `progress` is called with a counters snapshot
+    (files_chunked, chunks, batches_embedded, points_written) after every step.
+    The collection is provisioned (ensure_collection) before the first upsert.
+    If a `point_ids` set is given, the id of every upserted point is added to it.
+    """
+    batch_size = batch_size or embedder.batch_size
+    embed_workers = embed_workers or embedder.max_workers
+    embed_q = queue.Queue(maxsize=queue_size)
+    upsert_q = queue.Queue(maxsize=queue_size)
+    failed = threading.Event()
+    errors = []
+    stats = {"files_chunked": 0, "chunks": 0, "batches_embedded": 0, "points_written": 0}
+    stats_lock = threading.Lock()
+
+    def report(**increments):
+        with stats_lock:
+            for key, value in increments.items():
+                stats[key] += value
+            snapshot = dict(stats)
+        if progress:
+            progress(snapshot)
+        return snapshot
+
+    def fail(e):
+        errors.append(e)
+        failed.set()
+
+    def chunk_stage():
+        try:
+            batch = []
+            for _, file_chunks in iter_chunk_repo(file_contents):
+                batch.extend(file_chunks)
+                report(files_chunked=1, chunks=len(file_chunks))
+                while len(batch) >= batch_size:
+                    if not _put(embed_q, batch[:batch_size], failed):
+                        return
+                    batch = batch[batch_size:]
+            if batch:
+                _put(embed_q, batch, failed)
+        except Exception as e:
+            fail(e)
+        finally:
+            for _ in range(embed_workers):
+                _put(embed_q, None, failed)
+
+    def embed_stage():
+        try:
+            while True:
+                batch = _get(embed_q, failed)
+                if batch is None:
+                    return
+                vecs_with_metadata = embedder.embed_chunks(batch)
+                if not _put(upsert_q, vecs_with_metadata, failed):
+                    return
+                report(batches_embedded=1)
+        except Exception as e:
+            fail(e)
+        finally:
+            _put(upsert_q, None, failed)
+
+    def upsert_stage():
+        finished_workers = 0
+        writer = None
+        written = 0
+        try:
+            while finished_workers < embed_workers:
+                vecs_with_metadata = _get(upsert_q, failed)
+                if vecs_with_metadata is None:
+                    if failed.is_set():
+                        return
+                    finished_workers += 1
+                    continue
+                if writer is None:
+                    ensure_collection(client, collection_name, vector_size=embedder.dimensions)
+                    writer = QdrantBulkWriter(client, collection_name)
+                ids = embedder.upsert_embeddings(client, collection_name, repo_id, vecs_with_metadata, writer=writer)
+                if point_ids is not None:
+                    point_ids.update(ids)
+                # The writer uploads in the background; report what it has confirmed so far
+                confirmed = writer.points_written
+                snapshot = report(points_written=confirmed - written)
+                written = confirmed
+                logger.info(
+                    f"[stream_ingest] {collection_name}: {snapshot['files_chunked']} files chunked, "
+                    f"{snapshot['batches_embedded']} batches embedded, {snapshot['points_written']} points written"
+                )
+            if writer is not None:
+                writer.flush()
+                report(points_written=writer.points_written - written)
+        except Exception as e:
+            fail(e)
+        finally:
+            if writer is not None:
+                writer.shutdown()
+
+    threads = [threading.Thread(target=chunk_stage, name="ingest-chunk", daemon=True)]
+    threads += [threading.Thread(target=embed_stage, name=f"ingest-embed-{i}", daemon=True) for i in range(embed_workers)]
+    threads.append(threading.Thread(target=upsert_stage, name="ingest-upsert", daemon=True))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    if errors:
+        raise errors[0]
+    return stats
+
+
+_repo_locks = {}
+_repo_locks_guard = threading.Lock()
+
+def _repo_lock(repo_id: str) -> threading.Lock:
+    # One lock per repo for the life of the process
+    with _repo_locks_guard:
+        return _repo_locks.setdefault(repo_id, threading.Lock())
+
+
+def process_repo(file_contents: dict, repo_id: str, embedder, incremental: bool = False,
+                 progress: Optional[Callable[[dict], None]] = None):
+    """
+    Chunk, embed and upsert a repository into its Qdrant collection through the
+    streaming pipeline in stream_ingest; `progress` receives its counter snapshots.
+    With incremental=True, the existing collection is diffed against the per-file
+    hashes stored in its payloads: only added and changed files are chunked and
+    embedded, and once they are written the leftover points of changed and removed
+    files are deleted; if the repo has been clustered before, the new points are
+    folded into its clusters (absorb_points).
+    Otherwise the repo is built blue/green: into a new repo_{id}__v{timestamp}
+    collection while the old one keeps serving reads, then the repo_{id} alias is
+    switched over atomically and old versions are garbage collected. Point ids are
+    deterministic, so `point_diff` reports how many points were added, kept and removed.
+    Ingests of the same repo run one at a time (per-repo lock), so two builds never race
+    on the alias swap or garbage collect each other's collections.
+    """
+    with _repo_lock(repo_id):
+        return _process_repo(file_contents, repo_id, embedder, incremental, progress)
+
+
+def _process_repo(file_contents: dict, repo_id: str, embedder, incremental: bool,
+                  progress: Optional[Callable[[dict], None]]):
+    from src.backend.qdrant_client import get_qdrant_client
+    logger = logging.getLogger(__name__)
 
     client = get_qdrant_client()
     collection_name = f"repo_{repo_id}"
 
-    if not client.collection_exists(collection_name=collection_name):
-        from qdrant_client.models import VectorParams, Distance
-        client.create_collection(
-            collection_name=collection_name, 
-            vectors_config=VectorParams(size=1024, distance=Distance.COSINE)
+    file_diff = None
+    point_diff = None
+    written_ids = None
+    files_deleted = 0
+    exists = client.collection_exists(collection_name=collection_name)
+    if incremental and exists and get_vector_size(client, collection_name) != embedder.dimensions:
+        # Vectors of a different width cannot be mixed into the existing collection
+        logger.info(f"[process_repo] {collection_name} has a different vector size than "
+                    f"{embedder.dimensions}; rebuilding instead of ingesting incrementally")
+        incremental = False
+    if incremental and exists:
+        target = collection_name
+        file_diff = diff_file_hashes(file_contents, get_indexed_file_hashes(client, collection_name))
+        logger.info(
+            f"[process_repo] Incremental diff for {repo_id}: {len(file_diff['added'])} added, "
+            f"{len(file_diff['changed'])} changed, {len(file_diff['removed'])} removed, "
+            f"{len(file_diff['unchanged'])} unchanged"
         )
-        logger.info(f"[process_repo] Created new Qdrant collection: {collection_name}")
+        files_deleted = len(file_diff["removed"])
+        file_contents = {path: file_contents[path] for path in file_diff["added"] + file_diff["changed"]}
+        written_ids = set()
     else:
-        logger.info(f"[process_repo] Using existing Qdrant collection: {collection_name}")
+        target = versioned_collection_name(collection_name)
+        existing_ids = list_point_ids(client, collection_name) if exists else set()
+        written_ids = set()
+        logger.info(f"[process_repo] Building {target}; {collection_name} keeps serving until the swap")
+
+    try:
+        stats = stream_ingest(file_contents, repo_id, embedder, client, target,
+                              progress=progress, point_ids=written_ids)
+    except Exception:
+        # Never leave a half-built version behind; the live alias is untouched
+        if target != collection_name and client.collection_exists(collection_name=target):
+            client.delete_collection(collection_name=target)
+        raise
+    logger.info(f"[process_repo] Ingest stats for repo {repo_id}: {stats}")
 
-    embeddings = embedder.embed_chunks(chunks)
-    logger.info(f"[process_repo] Got {len(embeddings)} embeddings for repo {repo_id}")
+    if file_diff is not None:
+        # Old points go only once their replacements are written, so changed files stay
+        # searchable during the embed and survive a failed run. Ids are deterministic:
+        # chunks that did not change were just rewritten under the same id and are kept.
+        stale = file_diff["changed"] + file_diff["removed"]
+        if stale:
+            delete_file_points(client, collection_name, stale, keep_ids=written_ids)
+            logger.info(f"[process_repo] Deleted stale points for {len(stale)} changed or removed files")
 
-    embedder.upsert_embeddings(client, collection_name, repo_id, embeddings)
-    logger.info(f"[process_repo] Upserted embeddings into Qdrant collection: {collection_name}")
+    # An incremental run may legitimately embed nothing (only deletions, or no changes)
+    if not stats["chunks"] and target != collection_name:
+        logger.warning(f"[process_repo] No chunks generated for repo {repo_id}")
+        return {"chunks_processed": 0, "message": "No chunks generated", "file_diff": file_diff,
+                "point_diff": point_diff, "stats": stats}
+
+    absorbed = 0
+    if target == collection_name:
+        # Give the new chunks cluster_ids from the repo's last clustering instead of re-clustering
+        try:
+            absorbed = absorb_points(client, collection_name, repo_id, written_ids)
+        except Exception as e:
+            logger.warning(f"[process_repo] Could not absorb new points into clusters: {e}")
+    else:
+        try:
+            swap_alias(client, collection_name, target)
+        except ValueError:
+            # A newer version went live meanwhile (another process); drop this one
+            client.delete_collection(collection_name=target)
+            raise
+        gc_collection_versions(client, collection_name)
+        point_diff = {
+            "added": len(written_ids - existing_ids),
+            "unchanged": len(written_ids & existing_ids),
+            "removed": len(existing_ids - written_ids)
+        }
+        logger.info(f"[process_repo] Swapped {collection_name} to {target}: {point_diff}")
 
     return {
-        "chunks_processed": len(chunks),
+        "chunks_processed": stats["chunks"],
         "collection_name": collection_name,
-        "message": f"Successfully processed {len(chunks)} chunks"
-    }
\ No newline at end of file
+        "collection_version": target,
+        "file_diff": file_diff,
+        "point_diff": point_diff,
+        "points_clustered": absorbed,
+        "files_deleted": files_deleted,
+        "stats": stats,
+        "message": f"Successfully processed {stats['chunks']} chunks"
+                   + (f" and removed {files_deleted} deleted files" if files_deleted else "")
+    }
@@ -0,0 +1,212 @@
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from src.backend.config import JOB_WORKERS, JOB_MAX_PENDING, JOB_HISTORY
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ("queued", "running")
+
+
+class Job:
+    """
+    One unit of background work (load, ingest or summarize for a repo) and its progress.
+    The worker reports through stage() and progress(); snapshot() adds timing and
+    per-second throughput for every counter.
+    """
+    def __init__(self, kind: str, repo_id: str):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.repo_id = repo_id
+        self.status = "queued"
+        self.current_stage = None
+        self.counters = {}
+        self.stage_seconds = {}
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # Bumped on every change so watchers (SSE) only send new snapshots
+        self.version = 0
+        self._stage_started = None
+        self._lock = threading.Lock()
+
+    def _close_stage(self, now: float):
+        if self.current_stage is not None:
+            self.stage_seconds[self.current_stage] = round(
+                self.stage_seconds.get(self.current_stage, 0.0) + now - self._stage_started, 3
+            )
+
+    def stage(self, name: str, **counters):
+        """
+        Enter a new stage (e.g. "fetching", "ingesting"), optionally setting counters.
+        """
+        with self._lock:
+            now = time.time()
+            self._close_stage(now)
+            self.current_stage = name
+            self._stage_started = now
+            self.counters.update(counters)
+            self.version += 1
+
+    def progress(self, **counters):
+        """
+        Update progress counters (absolute values) for the current stage.
+        """
+        with self._lock:
+            self.counters.update(counters)
+            self.version += 1
+
+    def _start(self):
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+            self.version += 1
+
+    def _finish(self, result=None, error: Optional[str] = None):
+        with self._lock:
+            now = time.time()
+            self._close_stage(now)
+            self.current_stage = None
+            self.status = "failed" if error else "succeeded"
+            self.result = result
+            self.error = error
+            self.finished_at = now
+            self.version += 1
+
+    @property
+    def active(self) -> bool:
+        return self.status in ACTIVE_STATUSES
+
+    def snapshot(self, include_result: bool = True) -> dict:
+        with self._lock:
+            end = self.finished_at or time.time()
+            elapsed = end - self.started_at if self.started_at else 0.0
+            stage_seconds = dict(self.stage_seconds)
+            if self.current_stage is not None:
+                stage_seconds[self.current_stage] = round(
+                    stage_seconds.get(self.current_stage, 0.0) + end - self._stage_started, 3
+                )
+            snapshot = {
+                "job_id": self.id,
+                "kind": self.kind,
+                "repo_id": self.repo_id,
+                "status": self.status,
+                "stage": self.current_stage,
+                "progress": dict(self.counters),
+                "throughput": {
+                    f"{key}_per_second": round(value / elapsed, 2)
+                    for key, value in self.counters.items()
+                    if isinstance(value, (int, float)) and not key.endswith("_total") and elapsed > 0
+                },
+                "stage_seconds": stage_seconds,
+                "queued_seconds": round((self.started_at or end) - self.created_at, 3),
+                "elapsed_seconds": round(elapsed, 3),
+                "error": self.error,
+                "version": self.version
+            }
+            if include_result:
+                snapshot["result"] = self.result
+            return snapshot
+
+
+class JobManager:
+    """
+    In-process background jobs: a bounded thread pool runs the work, so no broker is
+    needed. At most one active job exists per (kind, repo_id); submitting a duplicate
+    returns the job already queued or running. Finished jobs are kept (up to
+    `history`) so their status and result can still be polled.
+    """
+    def __init__(self, max_workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING,
+                 history: int = JOB_HISTORY, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.max_pending = max_pending
+        self.history = history
+        # Event loop of the server; jobs use it for async steps via run_async()
+        self.loop = loop
+        self.jobs = OrderedDict()
+        self._active = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, repo_id: str, fn: Callable[[Job], dict]) -> Job:
+        """
+        Queue fn(job) and return the Job immediately, or the existing active job for
+        the same kind and repo. Raises RuntimeError when too many jobs are waiting.
+        """
+        with self._lock:
+            existing = self._active.get((kind, repo_id))
+            if existing is not None and existing.active:
+                logger.info(f"[JobManager] Reusing active {kind} job {existing.id} for {repo_id}")
+                return existing
+            pending = sum(1 for job in self._active.values() if job.status == "queued")
+            if pending >= self.max_pending:
+                raise RuntimeError(f"Too many queued jobs ({pending}); try again later")
+            job = Job(kind, repo_id)
+            self.jobs[job.id] = job
+            self._active[(kind, repo_id)] = job
+            self._prune()
+        self.executor.submit(self._run, job, fn)
+        logger.info(f"[JobManager] Queued {kind} job {job.id} for {repo_id}")
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], dict]):
+        job._start()
+        try:
+            result = fn(job)
+            # Pipelines report failures as {"status": "error", "message"} or {"error": ...}
+            if isinstance(result, dict) and (result.get("status") == "error" or result.get("error")):
+                job._finish(result=result, error=result.get("message") or result.get("error"))
+            else:
+                job._finish(result=result)
+        except Exception as e:
+            logger.exception(f"[JobManager] {job.kind} job {job.id} failed: {e}")
+            job._finish(error=f"{type(e).__name__}: {e}")
+        finally:
+            with self._lock:
+                if self._active.get((job.kind, job.repo_id)) is job:
+                    del self._active[(job.kind, job.repo_id)]
+        logger.info(f"[JobManager] {job.kind} job {job.id} {job.status} in {job.snapshot(False)['elapsed_seconds']}s")
+
+    def _prune(self):
+        # Drop the oldest finished jobs beyond the history limit
+        finished = [job_id for job_id, job in self.jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.history)]:
+            del self.jobs[job_id]
+
+    def run_async(self, coro):
+        """
+        Run a coroutine on the server's event loop from a job thread and wait for it.
+        """
+        if self.loop is None:
+            return asyncio.run(coro)
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self.jobs.get(job_id)
+
+    def list(self, repo_id: Optional[str] = None) -> list:
+        return [job for job in list(self.jobs.values()) if repo_id is None or job.repo_id == repo_id]
+
+    async def watch(self, job_id: str, interval: float = 0.5):
+        """
+        Async generator of snapshots, yielding each time the job changes until it finishes.
+        """
+        job = self.get(job_id)
+        last_version = -1
+        while job is not None:
+            if job.version != last_version:
+                snapshot = job.snapshot(include_result=not job.active)
+                last_version = snapshot["version"]
+                yield snapshot
+                if not job.active:
+                    return
+            await asyncio.sleep(interval)
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
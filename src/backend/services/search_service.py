@@ -1,7 +1,10 @@
 from tkinter import N
-from qdrant_client import QdrantClient
-from qdrant_client.models import Filter, FieldCondition, MatchValue, MatchText
+import asyncio
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.models import Filter, FieldCondition, MatchValue, MatchText, QueryRequest
 import logging
+from src.backend.utils.query_cache import QueryEmbeddingCache
+from src.backend.config import QUERY_CACHE_SIZE, QUERY_CACHE_TTL
 
 logging.basicConfig(
     level=logging.INFO,
@@ -9,40 +12,133 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 class SearchService:
-    def __init__(self, qdrant: QdrantClient, embedder, repo_id: str):
+    def __init__(self, qdrant: AsyncQdrantClient, embedder, repo_id: str):
         self.qdrant = qdrant
         self.embedder = embedder
         self.repo_id = repo_id
+        self.query_cache = QueryEmbeddingCache(QUERY_CACHE_SIZE, QUERY_CACHE_TTL)
+        # query -> task embedding it, so concurrent identical queries share one request
+        self._inflight = {}
 
-    def semantic_search(self, query: str, repo_id: str, file_path: str, n_max: int = 10):
+    async def semantic_search(self, query: str, repo_id: str, file_path: str, n_max: int = 10,
+                              offset=None, with_vectors: bool = False, payload_fields: list = None):
         """
         Perform a semantic search on the repo with optional strict filtering.
-        - If query is provided: use embedding search.
-        - If no query: just apply filter (returns all matching points).
+        Non-blocking: the query is embedded and searched through async clients.
+        - If query is provided: use embedding search; `offset` is the number of hits to skip.
+        - If no query: just apply filter; `offset` is the scroll cursor (a point id).
+        Vectors are left out unless with_vectors=True and `payload_fields` limits the
+        payload to those keys. Returns (points, next_offset), next_offset None on the last page.
         """
         filter_obj = self.build_filter(repo_id=repo_id, file_path=file_path)
         collection_name = f'repo_{repo_id or self.repo_id}'
+        with_payload = payload_fields or True
 
         if query:
-            query_embedding = self.embedder.embed_query(query)
-            results = self.qdrant.query_points(
+            query_embedding = await self.embed_query(query)
+            offset = int(offset or 0)
+            # Ask for one extra hit to know whether another page exists
+            results = await self.qdrant.query_points(
                 collection_name=collection_name,
                 query=query_embedding,
                 query_filter=filter_obj,
-                limit=n_max,
-                with_vectors=True
+                limit=n_max + 1,
+                offset=offset,
+                with_payload=with_payload,
+                with_vectors=with_vectors
             )
+            points = results.points[:n_max]
+            next_offset = offset + n_max if len(results.points) > n_max else None
         else:
-            results = self.qdrant.scroll(
+            points, next_offset = await self.qdrant.scroll(
                 collection_name=collection_name,
                 scroll_filter=filter_obj,
-                with_payload=True,
+                with_payload=with_payload,
                 limit=n_max,
-                with_vectors=True
+                offset=offset,
+                with_vectors=with_vectors
             )
-        logger.info(f"Raw Qdrant search result: {results}")
+        logger.debug(f"[semantic_search] {len(points)} points from {collection_name} (next_offset={next_offset})")
 
-        return results
+        return points, next_offset
+
+
+    async def embed_query(self, query: str):
+        """
+        Embed a search query: served from the LRU+TTL query cache when possible, and
+        concurrent identical queries await the same in-flight embedding request.
+        """
+        return (await self.embed_queries([query]))[0]
+
+
+    async def embed_queries(self, queries: list):
+        """
+        Embed many queries: cached ones are answered locally, ones already in flight are
+        awaited, and all remaining distinct queries share a single embedding request.
+        """
+        queries = [query.strip() for query in queries]
+        vectors = {}
+        waiting = {}
+        missing = []
+        for query in dict.fromkeys(queries):
+            vector = self.query_cache.get(query)
+            if vector is not None:
+                vectors[query] = vector
+            elif query in self._inflight:
+                self.query_cache.coalesced += 1
+                waiting[query] = self._inflight[query]
+            else:
+                missing.append(query)
+        if missing:
+            batch = asyncio.create_task(self._embed_and_cache(missing))
+            for query in missing:
+                self._inflight[query] = waiting[query] = asyncio.create_task(self._pick(batch, query))
+        if waiting:
+            # shield: a cancelled (disconnected) caller must not cancel shared requests
+            results = await asyncio.shield(asyncio.gather(*waiting.values()))
+            vectors.update(zip(waiting, results))
+        return [vectors[query] for query in queries]
+
+
+    async def _embed_and_cache(self, queries: list) -> dict:
+        embedded = dict(zip(queries, await self.embedder.embed_queries_async(queries)))
+        for query, vector in embedded.items():
+            self.query_cache.put(query, vector)
+        return embedded
+
+
+    async def _pick(self, batch, query: str):
+        try:
+            return (await batch)[query]
+        finally:
+            self._inflight.pop(query, None)
+
+
+    async def batch_search(self, queries: list, repo_id: str = None, file_path: str = None,
+                           n_max: int = 10, with_vectors: bool = False, payload_fields: list = None):
+        """
+        Run many semantic searches in two round-trips: one embedding request for all
+        queries and one Qdrant query_batch_points call. Each query is a string or a dict
+        {"query", "file_path", "limit"} overriding the shared file_path / n_max.
+        `payload_fields` limits the returned payload keys, as in semantic_search.
+        Returns one QueryResponse per query, in order.
+        """
+        specs = [q if isinstance(q, dict) else {"query": q} for q in queries]
+        vectors = await self.embed_queries([spec["query"] for spec in specs])
+        requests = [
+            QueryRequest(
+                query=vector,
+                filter=self.build_filter(repo_id=repo_id, file_path=spec.get("file_path", file_path)),
+                limit=spec.get("limit") or n_max,
+                with_payload=payload_fields or True,
+                with_vector=with_vectors
+            )
+            for spec, vector in zip(specs, vectors)
+        ]
+        return await self.qdrant.query_batch_points(
+            collection_name=f'repo_{repo_id or self.repo_id}',
+            requests=requests
+        )
 
 
     def build_filter(self, repo_id: str = None, file_path: str = None):
@@ -56,7 +152,8 @@ class SearchService:
             musts.append(FieldCondition(key="repo_id", match=MatchValue(value=repo_id)))
 
         if file_path:
-            musts.append(FieldCondition(key="file_path", match=MatchValue(value=file_path)))
+            # Chunk payloads store the path under "filepath"
+            musts.append(FieldCondition(key="filepath", match=MatchValue(value=file_path)))
 
         if musts:
             return Filter(must=musts)
@@ -64,20 +161,20 @@ class SearchService:
             return None
 
 
-    def fetch_all_points(self, repo_id: str = None, n_max: int = 3000):
+    async def fetch_all_points(self, repo_id: str = None, n_max: int = 3000):
         """
         Fetch all points from the Qdrant collection for a specific repo.
         """
         filter_obj = self.build_filter(repo_id=repo_id)
         collection_name = f'repo_{repo_id or self.repo_id}'
 
-        results = self.qdrant.scroll(
+        results = await self.qdrant.scroll(
             collection_name=collection_name,
             scroll_filter=filter_obj,
             with_payload=True,
             with_vectors=True,
             limit=n_max
         )
-        logger.info(f"Raw Qdrant fetch all points result: {results}")
+        logger.debug(f"[fetch_all_points] {len(results[0])} points from {collection_name}")
 
         return results
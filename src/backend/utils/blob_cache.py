@@ -0,0 +1,110 @@
+import os
+import threading
+import logging
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BlobCache:
+    """
+    On-disk, size-bounded LRU store of decoded file contents keyed by git blob SHA.
+    Blob SHAs are content addresses, so entries are shared across loads, repos and forks
+    and never need invalidation. Recency is tracked with file mtimes so the LRU order
+    survives restarts.
+    """
+    def __init__(self, cache_dir: str, max_bytes: int):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # sha -> size in bytes, least recently used first
+        self._total_bytes = 0
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load_index()
+
+    def _path(self, sha: str) -> str:
+        return os.path.join(self.cache_dir, sha[:2], sha[2:])
+
+    def _load_index(self):
+        entries = []
+        for prefix in os.scandir(self.cache_dir):
+            if not prefix.is_dir():
+                continue
+            for entry in os.scandir(prefix.path):
+                if entry.name.endswith(".tmp"):
+                    continue
+                st = entry.stat()
+                entries.append((st.st_mtime, prefix.name + entry.name, st.st_size))
+        for _, sha, size in sorted(entries):
+            self._index[sha] = size
+            self._total_bytes += size
+        logger.info(f"[BlobCache] Loaded {len(self._index)} blobs ({self._total_bytes} bytes) from {self.cache_dir}")
+
+    def get(self, sha: Optional[str]) -> Optional[str]:
+        if not sha:
+            return None
+        with self._lock:
+            if sha not in self._index:
+                self.misses += 1
+                return None
+            self._index.move_to_end(sha)
+        path = self._path(sha)
+        try:
+            with open(path, "rb") as f:
+                content = f.read().decode("utf-8")
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._total_bytes -= self._index.pop(sha, 0)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def put(self, sha: Optional[str], content: str):
+        if not sha:
+            return
+        data = content.encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(sha)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"[BlobCache] Failed to store blob {sha}: {e}")
+            return
+        with self._lock:
+            self._total_bytes += len(data) - self._index.pop(sha, 0)
+            self._index[sha] = len(data)
+            self._evict()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._index:
+            sha, size = self._index.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                os.remove(self._path(sha))
+            except OSError:
+                pass
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "entries": len(self._index),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,51 @@
+import json
+import zlib
+import hashlib
+import logging
+from importlib import metadata
+from typing import List, Optional
+from src.backend.utils.sqlite_cache import SQLiteLRUCache
+from src.backend.config import CHUNK_CACHE_PATH, CHUNK_CACHE_MAX_BYTES
+
+logger = logging.getLogger(__name__)
+
+try:
+    ASTCHUNK_VERSION = metadata.version("astchunk")
+except metadata.PackageNotFoundError:
+    ASTCHUNK_VERSION = "unknown"
+
+
+class ChunkCache(SQLiteLRUCache):
+    """
+    Cache of chunkify output keyed by (file hash, language, chunk config, astchunk version).
+    Chunk lists are stored as zlib-compressed JSON. Entries are content-addressed, so the
+    per-file `filepath` metadata is rewritten on read for the path being chunked.
+    """
+    @staticmethod
+    def make_key(file_hash: str, language: str, config: dict) -> str:
+        raw = json.dumps([file_hash, language, config, ASTCHUNK_VERSION], sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, file_path: str) -> Optional[List[dict]]:
+        blob = self.get_many_bytes([key]).get(key)
+        if blob is None:
+            return None
+        chunks = json.loads(zlib.decompress(blob))
+        for chunk in chunks:
+            chunk.get("metadata", chunk)["filepath"] = file_path
+        return chunks
+
+    def put(self, key: str, chunks: List[dict]):
+        self.put_many_bytes({key: zlib.compress(json.dumps(chunks, separators=(",", ":")).encode("utf-8"))})
+
+
+_chunk_cache = None
+
+def get_chunk_cache() -> Optional[ChunkCache]:
+    """
+    Process-wide chunk cache, or None when disabled with CHUNK_CACHE_MAX_BYTES=0.
+    """
+    global _chunk_cache
+    if _chunk_cache is None and CHUNK_CACHE_MAX_BYTES > 0:
+        _chunk_cache = ChunkCache(CHUNK_CACHE_PATH, CHUNK_CACHE_MAX_BYTES)
+    return _chunk_cache
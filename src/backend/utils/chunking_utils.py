@@ -1,9 +1,15 @@
 import os
+import time
+import hashlib
 import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from astchunk import ASTChunkBuilder
 from enum import Enum, auto
 from src.backend.language_enums import Language
-from src.backend.config import LANGUAGE_CONFIGS
+from src.backend.config import LANGUAGE_CONFIGS, CHUNK_WORKERS
+from src.backend.utils.chunk_cache import ChunkCache, get_chunk_cache
 
 logger = logging.getLogger(__name__)
 
@@ -21,25 +27,65 @@ def get_language_from_path(file_path):
     logger.debug(f"[get_language_from_path] {file_path} -> {lang}")
     return lang
 
-def chunk_file(file_path, file_content, language):
+def compute_file_hash(file_content: str) -> str:
+    """
+    SHA256 of a file's content; stored on every chunk so re-ingests can detect changed files.
+    """
+    return hashlib.sha256(file_content.encode("utf-8")).hexdigest()
+
+_builder_lock = threading.Lock()
+_idle_builders = {}
+
+def get_chunk_builder(language):
+    """
+    Check out an idle ASTChunkBuilder for a language from the process-wide pool,
+    creating one only when every builder for that language is in use. Builders hold a
+    tree-sitter parser, which is not thread-safe, so a builder is used by one caller at
+    a time and handed back with release_chunk_builder; the pool outlives the threads
+    that use it, so builders are reused across files and across ingests.
+    Returns (builder, setup_seconds) where setup_seconds is 0 for a reused builder.
+    """
+    with _builder_lock:
+        idle = _idle_builders.get(language)
+        if idle:
+            return idle.pop(), 0.0
+    start = time.perf_counter()
+    builder = ASTChunkBuilder(**LANGUAGE_CONFIGS[language])
+    return builder, time.perf_counter() - start
+
+def release_chunk_builder(language, builder):
+    """
+    Return a builder checked out with get_chunk_builder to the pool.
+    """
+    with _builder_lock:
+        _idle_builders.setdefault(language, []).append(builder)
+
+def chunk_file(file_path, file_content, language, timing=None):
     """
     Chunk a file into logical sections (functions/classes for code, paragraphs for docs).
     Returns a list of dicts: [{file_path, start_line, end_line, chunk_text, language}, ...]
+    If a `timing` dict is given, builder setup and parse time (seconds) are written to it.
     """
     configs = LANGUAGE_CONFIGS.get(language)
     if not configs:
         logger.info(f"[chunk_file] Skipping {file_path}: No config for language {language}")
         return []
 
+    chunk_builder = None
     try:
-        chunk_builder = ASTChunkBuilder(**configs)
+        chunk_builder, setup_seconds = get_chunk_builder(language)
 
         chunkify_configs = {
             "repo_level_metadata": {
                 "filepath": file_path
             }
         }
+        parse_start = time.perf_counter()
         chunks = chunk_builder.chunkify(file_content, **chunkify_configs)
+        parse_seconds = time.perf_counter() - parse_start
+        if timing is not None:
+            timing["setup_seconds"] = setup_seconds
+            timing["parse_seconds"] = parse_seconds
         # Add 'excerpt' to each chunk's metadata (use chunk_text or similar field)
         for chunk in chunks:
             if isinstance(chunk, dict):
@@ -54,28 +100,157 @@ def chunk_file(file_path, file_content, language):
     except Exception as e:
         logger.warning(f"[chunk_file] Could not chunk file {file_path}. Error: {e}")
         return []
+    finally:
+        if chunk_builder is not None:
+            release_chunk_builder(language, chunk_builder)
+
+_stats_lock = threading.Lock()
+_chunking_stats = {"files": 0, "chunks": 0, "builders_created": 0, "setup_seconds": 0.0, "parse_seconds": 0.0}
+
+def _record_timing(timing):
+    with _stats_lock:
+        _chunking_stats["files"] += 1
+        _chunking_stats["chunks"] += timing["chunks"]
+        _chunking_stats["setup_seconds"] += timing["setup_seconds"]
+        _chunking_stats["parse_seconds"] += timing["parse_seconds"]
+        if timing["setup_seconds"]:
+            _chunking_stats["builders_created"] += 1
+
+def get_chunking_stats():
+    """
+    Cumulative chunking instrumentation for this server process (including work done
+    in chunking worker processes): files, chunks, builders created, and seconds spent
+    in builder setup versus actual parsing.
+    """
+    with _stats_lock:
+        stats = dict(_chunking_stats)
+    total = stats["setup_seconds"] + stats["parse_seconds"]
+    stats["setup_share"] = round(stats["setup_seconds"] / total, 4) if total else None
+    stats["avg_parse_ms"] = round(1000 * stats["parse_seconds"] / stats["files"], 3) if stats["files"] else None
+    return stats
+
+def _chunk_one(file_path, content):
+    """
+    Chunk a single file and stamp its file_hash on every chunk. Module-level so it
+    can run in a worker process. Returns (file_chunks, timing) where timing is None
+    for files that were skipped without parsing.
+    """
+    language = get_language_from_path(file_path)
+    if not language:
+        logger.info(f"[chunk_repo] Skipping {file_path}: language not detected")
+        return [], None
+    if not content:
+        logger.info(f"[chunk_repo] Skipping {file_path}: empty content")
+        return [], None
+    timing = {"setup_seconds": 0.0, "parse_seconds": 0.0}
+    file_chunks = chunk_file(file_path, content, language, timing=timing)
+    file_hash = compute_file_hash(content)
+    for chunk in file_chunks:
+        chunk.get("metadata", chunk)["file_hash"] = file_hash
+    timing["chunks"] = len(file_chunks)
+    logger.info(
+        f"[chunk_repo] {file_path}: {len(file_chunks)} chunks, parse {1000 * timing['parse_seconds']:.1f}ms, "
+        f"builder setup {1000 * timing['setup_seconds']:.1f}ms"
+    )
+    return file_chunks, timing
+
+_process_pool = None
+_process_pool_workers = 0
 
-def chunk_repo(file_contents):
+def _get_process_pool(workers):
+    """
+    Lazily create a process pool and keep it for later ingests, so worker startup
+    (and any per-process parser state) is paid once. "spawn" avoids forking a
+    process that is running server and pipeline threads.
+    """
+    global _process_pool, _process_pool_workers
+    if _process_pool is None or _process_pool_workers != workers:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False)
+        _process_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        _process_pool_workers = workers
+    return _process_pool
+
+def _cache_lookup(cache, file_path, content):
+    # Returns (cached chunks or None, cache key or None); files that would not be parsed get no key
+    language = get_language_from_path(file_path)
+    if cache is None or not language or not content or language not in LANGUAGE_CONFIGS:
+        return None, None
+    key = ChunkCache.make_key(compute_file_hash(content), language.value, LANGUAGE_CONFIGS[language])
+    return cache.get(key, file_path), key
+
+def _finish(cache, key, file_chunks, timing):
+    if timing:
+        _record_timing(timing)
+        if key and file_chunks:
+            cache.put(key, file_chunks)
+
+def _iter_chunk_parallel(file_contents, workers, cache):
+    # Work through the repo in windows. Within a window the largest files are submitted
+    # first (longest-processing-time first) so workers finish at about the same time,
+    # while results are still yielded in input order and only a window is buffered.
+    pool = _get_process_pool(workers)
+    items = [(path, content) for path, content in file_contents.items()]
+    window = workers * 16
+    for start in range(0, len(items), window):
+        batch = items[start:start + window]
+        cached, keys, futures = {}, {}, {}
+        for path, content in batch:
+            cached[path], keys[path] = _cache_lookup(cache, path, content)
+        for path, content in sorted(batch, key=lambda item: len(item[1] or ""), reverse=True):
+            if cached[path] is None and get_language_from_path(path) and content:
+                futures[path] = pool.submit(_chunk_one, path, content)
+        for path, content in batch:
+            if cached[path] is not None:
+                yield path, cached[path]
+                continue
+            file_chunks, timing = futures[path].result() if path in futures else _chunk_one(path, content)
+            _finish(cache, keys[path], file_chunks, timing)
+            yield path, file_chunks
+
+def iter_chunk_repo(file_contents, workers=None, use_cache=True):
+    """
+    Lazily chunk a repository one file at a time.
+
+    Args:
+        file_contents (dict): A dictionary mapping file paths to their content.
+        workers (int): Worker processes for parsing; defaults to CHUNK_WORKERS.
+            1 chunks serially in the calling thread, 0 uses every CPU.
+        use_cache (bool): Serve unchanged files from the chunk cache (see get_chunk_cache)
+            instead of parsing them, and store newly parsed files.
+
+    Yields:
+        (file_path, file_chunks) for every file in input order, including files that
+        produced no chunks.
+    """
+    cache = get_chunk_cache() if use_cache else None
+    workers = CHUNK_WORKERS if workers is None else workers
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if workers > 1 and len(file_contents) > 1:
+        yield from _iter_chunk_parallel(file_contents, workers, cache)
+        return
+    for file_path, content in file_contents.items():
+        file_chunks, key = _cache_lookup(cache, file_path, content)
+        if file_chunks is None:
+            file_chunks, timing = _chunk_one(file_path, content)
+            _finish(cache, key, file_chunks, timing)
+        yield file_path, file_chunks
+
+def chunk_repo(file_contents, workers=None, use_cache=True):
     """
     Chunks all files in a given repository.
 
     Args:
         file_contents (dict): A dictionary mapping file paths to their content.
+        workers (int): Worker processes for parsing, see iter_chunk_repo.
+        use_cache (bool): Use the on-disk chunk cache, see iter_chunk_repo.
     
     Returns:
         A list containing all chunk dictionaries for the entire repository.
     """
     chunks = []
-    for file_path, content in file_contents.items():
-        language = get_language_from_path(file_path)
-        if not language:
-            logger.info(f"[chunk_repo] Skipping {file_path}: language not detected")
-            continue
-        if not content:
-            logger.info(f"[chunk_repo] Skipping {file_path}: empty content")
-            continue
-        file_chunks = chunk_file(file_path, content, language)
-        logger.info(f"[chunk_repo] {file_path}: {len(file_chunks)} chunks")
+    for _, file_chunks in iter_chunk_repo(file_contents, workers=workers, use_cache=use_cache):
         chunks.extend(file_chunks)
     logger.info(f"[chunk_repo] Total chunks generated: {len(chunks)}")
     return chunks
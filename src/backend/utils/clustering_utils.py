@@ -0,0 +1,283 @@
+import os
+import re
+import json
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Union
+
+import numpy as np
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from src.backend.config import (
+    CLUSTER_METHOD, CLUSTER_MINIBATCH_THRESHOLD, CLUSTER_BATCH_SIZE, CENTROID_CACHE_DIR, QDRANT_SCROLL_PAGE_SIZE,
+    CLUSTER_AUTO_MIN_K, CLUSTER_AUTO_MAX_K, CLUSTER_AUTO_SAMPLE, CLUSTER_AUTO_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+CLUSTER_METHODS = ("auto", "kmeans", "minibatch")
+
+
+class ClusteringEngine:
+    """
+    k-means over L2-normalized chunk vectors. fit() runs sklearn KMeans or MiniBatchKMeans
+    (method "auto" picks MiniBatchKMeans from CLUSTER_MINIBATCH_THRESHOLD points) and can
+    warm-start from earlier centroids. partial_fit() folds new points into the fitted
+    centroids without re-clustering, using MiniBatchKMeans' per-center running-mean update,
+    so the state to persist is just the centroids and their point counts.
+    """
+    def __init__(self, n_clusters: int, method: str = CLUSTER_METHOD, batch_size: int = CLUSTER_BATCH_SIZE,
+                 random_state: int = 42):
+        if method not in CLUSTER_METHODS:
+            raise ValueError(f"Unknown clustering method '{method}' (expected one of {CLUSTER_METHODS})")
+        self.n_clusters = n_clusters
+        self.method = method
+        self.batch_size = batch_size
+        self.random_state = random_state
+        self.centroids = None
+        self.counts = None
+        self.inertia = None
+        # Filled by fit(): resolved method, whether it warm-started, fit time
+        self.info = {}
+
+    def _resolve_method(self, n_points: int) -> str:
+        if self.method != "auto":
+            return self.method
+        return "minibatch" if n_points >= CLUSTER_MINIBATCH_THRESHOLD else "kmeans"
+
+    def fit(self, X: np.ndarray, init: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Cluster X and return its labels. `init` (e.g. centroids persisted by an earlier
+        fit) is used as the starting point when its shape matches, with a single init run.
+        """
+        n_clusters = min(self.n_clusters, len(X))
+        method = self._resolve_method(len(X))
+        warm = init is not None and np.shape(init) == (n_clusters, X.shape[1])
+        params = {
+            "n_clusters": n_clusters,
+            "init": np.asarray(init, dtype=X.dtype) if warm else "k-means++",
+            "n_init": 1 if warm else "auto",
+            "random_state": self.random_state
+        }
+        start = time.perf_counter()
+        if method == "minibatch":
+            estimator = MiniBatchKMeans(batch_size=self.batch_size, **params)
+        else:
+            estimator = KMeans(**params)
+        labels = estimator.fit_predict(X)
+        self.centroids = estimator.cluster_centers_.astype(np.float32)
+        self.counts = np.bincount(labels, minlength=n_clusters).astype(np.int64)
+        self.inertia = float(estimator.inertia_)
+        self.info = {"method": method, "warm_start": warm, "seconds": round(time.perf_counter() - start, 3)}
+        return labels
+
+    def predict(self, X: np.ndarray, block: int = 65536) -> np.ndarray:
+        """
+        Index of the nearest centroid for each row of X (in blocks, to bound memory).
+        """
+        sq_norms = np.einsum("ij,ij->i", self.centroids, self.centroids)
+        labels = np.empty(len(X), dtype=np.int64)
+        for start in range(0, len(X), block):
+            # ||x - c||^2 up to the constant ||x||^2
+            scores = sq_norms - 2.0 * (X[start:start + block] @ self.centroids.T)
+            labels[start:start + block] = np.argmin(scores, axis=1)
+        return labels
+
+    def partial_fit(self, X: np.ndarray) -> np.ndarray:
+        """
+        Assign new points to the nearest centroids and move each centroid to the running
+        mean of every point it has absorbed. Returns the labels of X.
+        """
+        if self.centroids is None:
+            raise RuntimeError("partial_fit needs fitted centroids; call fit() first")
+        labels = self.predict(X)
+        batch_counts = np.bincount(labels, minlength=len(self.centroids))
+        sums = np.zeros_like(self.centroids, dtype=np.float64)
+        np.add.at(sums, labels, X)
+        touched = batch_counts > 0
+        self.counts += batch_counts
+        self.centroids[touched] += (
+            (sums[touched] - batch_counts[touched, None] * self.centroids[touched]) / self.counts[touched, None]
+        ).astype(np.float32)
+        return labels
+
+
+class CentroidStore:
+    """
+    Fitted centroids and counts per repo, one .npz file each, so the next clustering of
+    the repo can warm-start and incremental ingests can be absorbed with partial_fit.
+    """
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, repo_id: str) -> str:
+        return os.path.join(self.cache_dir, re.sub(r"[^\w.-]", "_", repo_id) + ".npz")
+
+    def load(self, repo_id: str) -> Optional[ClusteringEngine]:
+        path = self._path(repo_id)
+        if not os.path.exists(path):
+            return None
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                engine = ClusteringEngine(len(data["centroids"]), method=meta.get("method", CLUSTER_METHOD))
+                engine.centroids = data["centroids"].astype(np.float32)
+                engine.counts = data["counts"].astype(np.int64)
+                engine.inertia = meta.get("inertia")
+                engine.info = meta.get("info", {})
+            return engine
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"[CentroidStore] Ignoring unreadable centroids for {repo_id}: {e}")
+            return None
+
+    def save(self, repo_id: str, engine: ClusteringEngine):
+        path = self._path(repo_id)
+        meta = json.dumps({"method": engine.method, "inertia": engine.inertia, "info": engine.info})
+        tmp = path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, centroids=engine.centroids, counts=engine.counts, meta=np.array(meta))
+        os.replace(tmp, path)
+
+    def delete(self, repo_id: str):
+        try:
+            os.remove(self._path(repo_id))
+        except FileNotFoundError:
+            pass
+
+
+_centroid_store = None
+
+def get_centroid_store() -> CentroidStore:
+    global _centroid_store
+    if _centroid_store is None:
+        _centroid_store = CentroidStore(CENTROID_CACHE_DIR)
+    return _centroid_store
+
+
+def cluster_points(X: np.ndarray, n_clusters: int, repo_id: Optional[str] = None, method: str = CLUSTER_METHOD):
+    """
+    Fit a ClusteringEngine on X, warm-started from the repo's persisted centroids when
+    they fit (same k and dimension), and persist the new centroids.
+    Returns (labels, centroids, engine).
+    """
+    if X.size == 0 or X.shape[0] == 0:
+        return np.array([]), np.array([]), None
+    store = get_centroid_store() if repo_id else None
+    previous = store.load(repo_id) if store else None
+    engine = ClusteringEngine(n_clusters, method=method)
+    labels = engine.fit(X, init=previous.centroids if previous is not None else None)
+    logger.info(f"[cluster_points] k={len(engine.centroids)} on {len(X)} points: {engine.info}, inertia {engine.inertia:.2f}")
+    if store:
+        store.save(repo_id, engine)
+    return labels, engine.centroids, engine
+
+
+def parse_cluster_k(cluster_k: Union[int, str, None]) -> Optional[int]:
+    """
+    Request value of cluster_k -> a fixed k, or None for "auto".
+    """
+    if cluster_k is None or str(cluster_k).strip().lower() in ("", "auto"):
+        return None
+    try:
+        k = int(cluster_k)
+    except ValueError:
+        k = 0
+    if k < 1:
+        raise ValueError("cluster_k must be a positive integer or 'auto'")
+    return k
+
+
+def candidate_ks(n_points: int, min_k: int = CLUSTER_AUTO_MIN_K, max_k: int = CLUSTER_AUTO_MAX_K) -> List[int]:
+    """
+    Roughly geometric grid of k values to try. The upper end grows like sqrt(n/2), so
+    tiny repos are not split into many clusters (each one costs an LLM call), and is
+    capped at max_k for huge ones.
+    """
+    upper = min(max_k, max(min_k, int(np.sqrt(n_points / 2))), n_points - 1)
+    if upper < min_k:
+        return [max(1, min(min_k, n_points))]
+    ks, k = [], min_k
+    while k <= upper:
+        ks.append(k)
+        k = max(k + 1, int(round(k * 1.25)))
+    if ks[-1] != upper:
+        ks.append(upper)
+    return ks
+
+
+def _score_k(sample: np.ndarray, k: int, silhouette_points: int, random_state: int) -> dict:
+    estimator = MiniBatchKMeans(n_clusters=k, batch_size=CLUSTER_BATCH_SIZE, n_init=3, random_state=random_state)
+    labels = estimator.fit_predict(sample)
+    if len(np.unique(labels)) < 2:
+        return {"k": k, "silhouette": -1.0, "inertia": float(estimator.inertia_)}
+    score = silhouette_score(sample, labels, sample_size=min(silhouette_points, len(sample)), random_state=random_state)
+    return {"k": k, "silhouette": round(float(score), 4), "inertia": round(float(estimator.inertia_), 3)}
+
+
+def select_k(X: np.ndarray, candidates: Optional[List[int]] = None, sample_size: int = CLUSTER_AUTO_SAMPLE,
+             workers: int = CLUSTER_AUTO_WORKERS, random_state: int = 42) -> dict:
+    """
+    Pick k for X: every candidate is fitted (MiniBatchKMeans) on the same random subsample
+    of at most sample_size points, in parallel threads, and scored by silhouette on a
+    sample of that subsample. The highest silhouette wins; ties go to the smaller k.
+    Returns {"k", "scores": [...], "sample_size", "seconds"}.
+    """
+    start = time.perf_counter()
+    candidates = candidates or candidate_ks(len(X))
+    rng = np.random.default_rng(random_state)
+    sample = X[np.sort(rng.choice(len(X), size=sample_size, replace=False))] if len(X) > sample_size else X
+    candidates = [k for k in candidates if 2 <= k < len(sample)]
+    if not candidates:
+        return {"k": max(1, min(CLUSTER_AUTO_MIN_K, len(X))), "scores": [], "sample_size": len(sample),
+                "seconds": round(time.perf_counter() - start, 3)}
+
+    silhouette_points = min(len(sample), 1000)
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        scores = list(pool.map(lambda k: _score_k(sample, k, silhouette_points, random_state), candidates))
+    best = max(scores, key=lambda score: (score["silhouette"], -score["k"]))
+    result = {"k": best["k"], "scores": scores, "sample_size": len(sample), "seconds": round(time.perf_counter() - start, 3)}
+    logger.info(f"[select_k] Chose k={best['k']} (silhouette {best['silhouette']}) from {candidates} in {result['seconds']}s")
+    return result
+
+
+def absorb_points(qdrant_client, collection_name: str, repo_id: str, point_ids: List,
+                  page_size: int = QDRANT_SCROLL_PAGE_SIZE) -> int:
+    """
+    Fold newly ingested points into the repo's persisted clustering with partial_fit and
+    write their cluster_id payloads, without re-clustering the collection. No-op when the
+    repo has not been clustered yet (or was clustered at another vector size).
+    Returns the number of points absorbed.
+    """
+    store = get_centroid_store()
+    engine = store.load(repo_id)
+    if engine is None or not point_ids:
+        return 0
+    point_ids = list(point_ids)
+    absorbed_ids, vectors = [], []
+    for start in range(0, len(point_ids), page_size):
+        records = qdrant_client.retrieve(collection_name=collection_name, ids=point_ids[start:start + page_size],
+                                         with_payload=False, with_vectors=True)
+        for record in records:
+            if record.vector is not None:
+                absorbed_ids.append(record.id)
+                vectors.append(record.vector)
+    if not vectors:
+        return 0
+    X = np.asarray(vectors, dtype=np.float32)
+    if X.shape[1] != engine.centroids.shape[1]:
+        logger.info(f"[absorb_points] Stored centroids for {repo_id} have another dimension; skipping")
+        return 0
+    X /= np.clip(np.linalg.norm(X, axis=1, keepdims=True), 1e-8, None)
+
+    labels = engine.partial_fit(X)
+    for cluster_id in np.unique(labels):
+        qdrant_client.set_payload(
+            collection_name=collection_name,
+            payload={"cluster_id": int(cluster_id)},
+            points=[absorbed_ids[i] for i in np.flatnonzero(labels == cluster_id)]
+        )
+    store.save(repo_id, engine)
+    logger.info(f"[absorb_points] Absorbed {len(absorbed_ids)} points into {len(engine.centroids)} clusters for {repo_id}")
+    return len(absorbed_ids)
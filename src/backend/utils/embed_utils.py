@@ -1,37 +1,192 @@
+import time
+import random
+import logging
+import asyncio
+import httpx
 import requests
-from qdrant_client.models import PointStruct
-import uuid
-from src.backend.config import JINA_API_URL, JINA_HEADERS
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from src.backend.utils.embedding_cache import EmbeddingCache
+from src.backend.utils.http_utils import get_http_session, get_async_http_client
+from src.backend.utils.qdrant_utils import QdrantBulkWriter, point_id_for
+from src.backend.config import (
+    JINA_API_URL, JINA_HEADERS, JINA_BATCH_SIZE, JINA_MAX_BATCH_TOKENS,
+    JINA_MAX_WORKERS, JINA_MAX_RETRIES, JINA_TIMEOUT, EMBEDDING_DIM
+)
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate (~4 characters per token) used to size embedding requests.
+    """
+    return max(1, len(text) // 4)
+
+
+def make_batches(texts, max_batch_size: int, max_batch_tokens: int):
+    """
+    Split texts into contiguous (start, end) ranges holding at most max_batch_size
+    texts and max_batch_tokens estimated tokens. A single oversized text gets its own batch.
+    """
+    batches = []
+    start = 0
+    tokens = 0
+    for i, text in enumerate(texts):
+        text_tokens = estimate_tokens(text)
+        if i > start and (i - start >= max_batch_size or tokens + text_tokens > max_batch_tokens):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += text_tokens
+    if start < len(texts):
+        batches.append((start, len(texts)))
+    return batches
+
+
+def truncate_embeddings(vectors, dimensions: int) -> np.ndarray:
+    """
+    Matryoshka truncation: keep the first `dimensions` components of each vector and
+    L2-normalize again. Equivalent to requesting `dimensions` from jina-embeddings-v3.
+    """
+    truncated = np.asarray(vectors, dtype=np.float32)[:, :dimensions]
+    norms = np.linalg.norm(truncated, axis=1, keepdims=True)
+    return truncated / np.maximum(norms, 1e-12)
 
 
 class JinaEmbedder:
-    def __init__(self, api_key, model='jina-embeddings-v3'):
-        self.api_url = JINA_API_URL
+    def __init__(self, api_key, model='jina-embeddings-v3',
+                 api_url=None,
+                 batch_size=JINA_BATCH_SIZE,
+                 max_batch_tokens=JINA_MAX_BATCH_TOKENS,
+                 max_workers=JINA_MAX_WORKERS,
+                 max_retries=JINA_MAX_RETRIES,
+                 cache=None,
+                 dimensions=EMBEDDING_DIM):
+        self.api_url = api_url or JINA_API_URL
         self.headers = {**JINA_HEADERS, "Authorization": f"Bearer {api_key}"}
         self.model = model
+        # Requested output width; the model truncates (Matryoshka) and renormalizes
+        self.dimensions = dimensions
+        self.batch_size = batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_workers = max_workers
+        self.max_retries = max_retries
+        # Optional EmbeddingCache consulted before any network call
+        self.cache = cache
+        self.tokens_saved = 0
+        # Process-wide pooled connections, shared by all batch workers
+        self.session = get_http_session()
+
+    def _request_body(self, texts, task):
+        return {
+            "model": self.model,
+            "task": task,
+            "dimensions": self.dimensions,
+            "input": texts
+        }
+
+    @staticmethod
+    def _parse_vectors(body):
+        items = sorted(body["data"], key=lambda d: d.get("index", 0))
+        return [item["embedding"] for item in items]
+
+    def _retry_delay(self, texts, attempt, error, retry_after):
+        if attempt == self.max_retries:
+            raise RuntimeError(f"Embedding request for {len(texts)} inputs failed after {attempt + 1} attempts: {error}")
+        try:
+            delay = float(retry_after)
+        except (TypeError, ValueError):
+            delay = 0.5 * (2 ** attempt) + random.uniform(0, 0.5)
+        logger.warning(f"[embed_chunks] Batch of {len(texts)} failed ({error}), retrying in {delay:.2f}s")
+        return delay
+
+    def _post_embeddings(self, texts, task="text-matching"):
+        """
+        POST one embedding request, retrying throttled, 5xx and connection failures
+        with exponential backoff. Returns vectors in input order.
+        """
+        data = self._request_body(texts, task)
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = self.session.post(self.api_url, headers=self.headers, json=data, timeout=JINA_TIMEOUT)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return self._parse_vectors(response.json())
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            time.sleep(self._retry_delay(texts, attempt, error, retry_after))
+
+    async def _post_embeddings_async(self, texts, task="text-matching"):
+        """
+        Non-blocking _post_embeddings over the shared httpx.AsyncClient, for request handlers.
+        """
+        client = get_async_http_client()
+        data = self._request_body(texts, task)
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await client.post(self.api_url, headers=self.headers, json=data, timeout=JINA_TIMEOUT)
+                if response.status_code not in RETRYABLE_STATUS_CODES:
+                    response.raise_for_status()
+                    return self._parse_vectors(response.json())
+                error = f"HTTP {response.status_code}"
+                retry_after = response.headers.get("Retry-After")
+            except httpx.TransportError as e:
+                error = str(e)
+            await asyncio.sleep(self._retry_delay(texts, attempt, error, retry_after))
+
+    def _embed_texts(self, texts, task="text-matching"):
+        """
+        Embed texts, serving repeats from the cache and sending each distinct uncached
+        text once. Uncached texts are batched by count and estimated tokens, sent
+        concurrently by up to max_workers threads and retried per batch.
+        Returns vectors in input order.
+        """
+        keys = [EmbeddingCache.make_key(self.model, task, text, self.dimensions) for text in texts] if self.cache else None
+        known = self.cache.get_many(keys) if self.cache else {}
+
+        # Distinct texts that still need embedding, in first-seen order
+        pending = {}
+        for i, text in enumerate(texts):
+            if keys and keys[i] in known:
+                continue
+            pending.setdefault(text, i)
+        pending_texts = list(pending)
+
+        batches = make_batches(pending_texts, self.batch_size, self.max_batch_tokens)
+        if batches:
+            with ThreadPoolExecutor(max_workers=max(1, min(self.max_workers, len(batches)))) as pool:
+                batch_vectors = list(pool.map(lambda b: self._post_embeddings(pending_texts[b[0]:b[1]], task), batches))
+            fresh = dict(zip(pending_texts, (v for vectors in batch_vectors for v in vectors)))
+        else:
+            fresh = {}
+
+        if self.cache:
+            self.cache.put_many({keys[i]: fresh[text] for text, i in pending.items() if fresh[text]})
+            self.tokens_saved += sum(estimate_tokens(text) for i, text in enumerate(texts) if keys[i] in known)
+        logger.debug(f"[embed_chunks] {len(texts)} inputs: {len(texts) - len(pending_texts)} served from cache/duplicates, "
+                     f"{len(pending_texts)} embedded in {len(batches)} batches")
+
+        return [known[keys[i]] if keys and keys[i] in known else fresh[text] for i, text in enumerate(texts)]
 
     def embed_chunks(self, chunk_list):
         """
-        Given a list of chunks, call the jina-embeddings-v3 API to embed each chunk
+        Given a list of chunks, call the jina-embeddings-v3 API to embed each chunk.
+        Cached chunks skip the network entirely; output order matches input.
         """
         input_text = [chunk['content'] for chunk in chunk_list]
-        data = {
-            "model": self.model,
-            "task": "text-matching",
-            "input": input_text
-        }
-
-        response = requests.post(self.api_url, headers=self.headers, json=data)
-        response.raise_for_status()
+        vectors = self._embed_texts(input_text)
 
         vecs_with_metadata = []
-        for i, emb_data in enumerate(response.json()["data"]):
-            vector = emb_data["embedding"]
+        for i, vector in enumerate(vectors):
             metadata = chunk_list[i]["metadata"]
             if not vector or not isinstance(vector, (list, tuple)):
                 print(f"[embed_chunks] WARNING: Empty or invalid vector for chunk {i}")
-            else:
-                print(f"[embed_chunks] Vector {i} length: {len(vector)} type: {type(vector)}")
             vecs_with_metadata.append((vector, metadata))
         print(f"[embed_chunks] Returning {len(vecs_with_metadata)} vectors")
         
@@ -42,40 +197,56 @@ class JinaEmbedder:
         """
         Embed a query using the jina-embeddings-v3 API.
         """
-        data = {
-            "model": self.model,
-            "task": "text-matching",
-            "input": [query]
-        }
+        return self._embed_texts([query])[0]
+
+    async def embed_query_async(self, query: str, task: str = "text-matching"):
+        """
+        embed_query for async handlers: the cache lookup runs in a worker thread and the
+        API call goes through the shared async HTTP client, so the event loop never blocks.
+        """
+        return (await self.embed_queries_async([query], task))[0]
 
-        response = requests.post(self.api_url, headers=self.headers, json=data)
-        response.raise_for_status()
+    async def embed_queries_async(self, queries, task: str = "text-matching"):
+        """
+        Embed several queries at once without blocking: cached ones come from the
+        EmbeddingCache, the remaining distinct queries go out in as few requests as the
+        batch limits allow (normally one), sent concurrently. Returns vectors in input order.
+        """
+        keys = [EmbeddingCache.make_key(self.model, task, q, self.dimensions) for q in queries] if self.cache else None
+        known = await asyncio.to_thread(self.cache.get_many, keys) if keys else {}
+        pending = list(dict.fromkeys(q for i, q in enumerate(queries) if not (keys and keys[i] in known)))
+
+        batches = make_batches(pending, self.batch_size, self.max_batch_tokens)
+        batch_vectors = await asyncio.gather(*(self._post_embeddings_async(pending[a:b], task) for a, b in batches))
+        fresh = dict(zip(pending, (v for vectors in batch_vectors for v in vectors)))
 
-        return response.json()["data"][0]["embedding"]
+        if keys:
+            new = {keys[i]: fresh[q] for i, q in enumerate(queries) if q in fresh and fresh[q]}
+            if new:
+                await asyncio.to_thread(self.cache.put_many, new)
+            self.tokens_saved += sum(estimate_tokens(q) for i, q in enumerate(queries) if keys[i] in known)
+        return [known[keys[i]] if keys and keys[i] in known else fresh[q] for i, q in enumerate(queries)]
 
 
-    def upsert_embeddings(self, qdrant_client, collection_name, repo_id, vecs_with_metadata):
+    def upsert_embeddings(self, qdrant_client, collection_name, repo_id, vecs_with_metadata, writer=None):
         """
         Upsert embeddings into Qdrant with repo_id as a filterable field.
+        Point ids are derived from the chunk (see point_id_for), so re-upserting the same
+        chunk overwrites it in place. Returns the ids written.
+        Points go through a QdrantBulkWriter; pass a shared `writer` to keep batching
+        across calls (the caller then flushes it), otherwise one is flushed here.
         """
-        points = []
+        if writer is None:
+            with QdrantBulkWriter(qdrant_client, collection_name) as own_writer:
+                return self.upsert_embeddings(qdrant_client, collection_name, repo_id, vecs_with_metadata, writer=own_writer)
+
+        point_ids = []
         for i, (vector, metadata) in enumerate(vecs_with_metadata):
             metadata["repo_id"] = repo_id
             if not vector or not isinstance(vector, (list, tuple)):
                 print(f"[upsert_embeddings] WARNING: Skipping upsert for missing/invalid vector at idx {i}: {vector}")
                 continue
-            print(f"[upsert_embeddings] Upserting vector idx {i} length: {len(vector)}")
-            points.append(
-                PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=list(map(float, vector)),
-                    payload=metadata
-                )
-            )
-            
-        collection_info = qdrant_client.get_collection(collection_name)
-        
-        qdrant_client.upsert(
-            collection_name=collection_name,
-            points=points
-        )
+            point_id = point_id_for(repo_id, metadata)
+            writer.add(point_id, vector, metadata)
+            point_ids.append(point_id)
+        return point_ids
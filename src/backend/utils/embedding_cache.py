@@ -0,0 +1,31 @@
+import hashlib
+import numpy as np
+from typing import Dict, List, Optional
+from src.backend.utils.sqlite_cache import SQLiteLRUCache
+
+
+class EmbeddingCache(SQLiteLRUCache):
+    """
+    SQLite-backed cache of embedding vectors keyed by (model, dimensions, task, sha256(text)).
+    Vectors are stored as float32 blobs with LRU eviction beyond max_bytes.
+    """
+    @staticmethod
+    def make_key(model: str, task: str, text: str, dimensions: Optional[int] = None) -> str:
+        if dimensions:
+            model = f"{model}@{dimensions}"
+        return f"{model}:{task}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+    def get_many(self, keys: List[str]) -> Dict[str, List[float]]:
+        return {
+            key: np.frombuffer(blob, dtype=np.float32).tolist()
+            for key, blob in self.get_many_bytes(keys).items()
+        }
+
+    def get(self, key: str) -> Optional[List[float]]:
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, List[float]]):
+        self.put_many_bytes({key: np.asarray(vector, dtype=np.float32).tobytes() for key, vector in items.items()})
+
+    def put(self, key: str, vector: List[float]):
+        self.put_many({key: vector})
@@ -1,12 +1,24 @@
 import os
-import requests
+import time
+import random
+import asyncio
+import httpx
 import base64
-from typing import Optional, Set
+import tarfile
+import zipfile
+import subprocess
+from typing import Callable, Optional, Set, Iterable
+from urllib.parse import quote
 import logging
 #from google.adk.tools import ToolContext
 #from google.cloud import secretmanager
 from src.backend.utils.chunking_utils import chunk_repo
-from src.backend.config import GITHUB_TOKEN, PROJECT_ID
+from src.backend.utils.blob_cache import BlobCache
+from src.backend.utils.http_utils import get_http_session
+from src.backend.config import (
+    GITHUB_TOKEN, PROJECT_ID, GITHUB_API_URL,
+    GITHUB_FETCH_CONCURRENCY, GITHUB_FETCH_TIMEOUT, GITHUB_FETCH_MAX_RETRIES
+)
 
 import sys
 
@@ -35,6 +47,19 @@ except Exception as e:
     GITHUB_TOKEN = os.getenv("GITHUB_TOKEN")
 '''
 
+DEFAULT_EXCLUDE_FOLDERS = {'node_modules', '__pycache__', 'dist', 'build', 'out', 'target', 'vendor'}
+DEFAULT_EXCLUDE_EXTENSIONS = {'.png', '.jpg', '.gif', '.ico', '.exe', '.dll', '.class', '.o', '.so'}
+
+
+def is_excluded(file_path: str, exclude_folders: Set[str], exclude_extensions: Set[str]) -> bool:
+    """
+    True if the path sits under an excluded folder or has an excluded extension.
+    """
+    if any(folder in file_path.split('/') for folder in exclude_folders):
+        return True
+    return os.path.splitext(file_path)[1].lower() in exclude_extensions
+
+
 #filters through
 def list_files(repo: str, owner: str,
     exclude_folders: Optional[Set[str]] = None,
@@ -43,9 +68,9 @@ def list_files(repo: str, owner: str,
 ) -> dict:
     headers = {"Authorization": f"token {GITHUB_TOKEN}"}
     if exclude_folders is None:
-        exclude_folders = {'node_modules', '__pycache__', 'dist', 'build', 'out', 'target', 'vendor'}
+        exclude_folders = DEFAULT_EXCLUDE_FOLDERS
     if exclude_extensions is None:
-        exclude_extensions = {'.png', '.jpg', '.gif', '.ico', '.exe', '.dll', '.class', '.o', '.so'}
+        exclude_extensions = DEFAULT_EXCLUDE_EXTENSIONS
     if include_files is None:
         include_files = {'README.md', 'CONTRIBUTING.md', 'CHANGELOG.md',
                          'Dockerfile', 'docker-compose.yml', '.env',
@@ -57,24 +82,26 @@ def list_files(repo: str, owner: str,
     logger.info(f"Successfully filtered files for repo {repo}")
     try:
         # Get default branch
-        repo_resp = requests.get(f"https://api.github.com/repos/{owner}/{repo}", headers=headers)
+        session = get_http_session()
+        repo_resp = session.get(f"{GITHUB_API_URL}/repos/{owner}/{repo}", headers=headers, timeout=GITHUB_FETCH_TIMEOUT)
         repo_resp.raise_for_status()
         repo_info = repo_resp.json()
         default_branch = repo_info.get("default_branch", "main")
 
-        response = requests.get(f"https://api.github.com/repos/{owner}/{repo}/git/trees/{default_branch}?recursive=1", headers=headers)
+        response = session.get(f"{GITHUB_API_URL}/repos/{owner}/{repo}/git/trees/{default_branch}?recursive=1", headers=headers, timeout=GITHUB_FETCH_TIMEOUT)
         response.raise_for_status()
         logger.info(f"Successfully fetched file tree for repo {repo}")
 
         tree = response.json().get('tree', [])
         files = [item['path'] for item in tree if item['type'] == 'blob']
+        shas = {item['path']: item.get('sha') for item in tree if item['type'] == 'blob'}
         logger.info(f"Successfully extracted {len(files)} files from repo {repo}")
 
         context_files = {item['path'] for item in tree if item['path'] in include_files}
-        files = [file for file in files if not any(folder in file.split('/') for folder in exclude_folders)]
+        files = [file for file in files if not is_excluded(file, exclude_folders, exclude_extensions)]
 
         logger.info(f"Successfully filtered files for repo {repo}")
-        return {"status": "success", "files": files}
+        return {"status": "success", "files": files, "shas": {file: shas[file] for file in files}}
     except Exception as e:
         logger.error(f"Failed to list files: {e}")
         return {"status": "error", "message": str(e)}
@@ -83,7 +110,7 @@ def list_files(repo: str, owner: str,
 def get_file_contents(repo: str, file_path: str, owner: str) -> dict:
     headers = {"Authorization": f"token {GITHUB_TOKEN}"}
     try:
-        response = requests.get(f"https://api.github.com/repos/{owner}/{repo}/contents/{file_path}", headers=headers)
+        response = get_http_session().get(f"{GITHUB_API_URL}/repos/{owner}/{repo}/contents/{file_path}", headers=headers, timeout=GITHUB_FETCH_TIMEOUT)
         response.raise_for_status()
         content = response.json().get('content', '')
         decoded_content = base64.b64decode(content).decode('utf-8')
@@ -91,6 +118,337 @@ def get_file_contents(repo: str, file_path: str, owner: str) -> dict:
     except Exception as e:
         return {"status": "error", "message": str(e)}
 
+
+def _strip_components(path: str, n: int) -> str:
+    parts = path.split('/')
+    return '/'.join(parts[n:]) if len(parts) > n else ''
+
+
+def _read_tar_stream(fileobj, mode: str, strip_components: Optional[int],
+                     exclude_folders: Set[str], exclude_extensions: Set[str]) -> dict:
+    """
+    Read text files out of a (possibly compressed) tar stream, member by member,
+    so neither the compressed nor the full uncompressed archive is held in memory.
+    With strip_components=None, a single wrapping top-level directory is detected in
+    the same pass: it is taken from the first file and stripped, and if a later file
+    turns out to sit outside it, the paths read so far get their prefix back.
+    """
+    files = {}
+    failed_files = []
+    prefix = None
+    with tarfile.open(fileobj=fileobj, mode=mode) as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            top = member.name.split('/', 1)[0] if '/' in member.name else None
+            if strip_components is None:
+                prefix = top
+                strip_components = 0 if top is None else 1
+            elif prefix is not None and top != prefix:
+                # Not a single wrapping directory after all: restore the full paths
+                files = {f"{prefix}/{p}": c for p, c in files.items()
+                         if not is_excluded(f"{prefix}/{p}", exclude_folders, exclude_extensions)}
+                failed_files = [f"{prefix}/{p}" for p in failed_files]
+                prefix = None
+                strip_components = 0
+            path = _strip_components(member.name, strip_components)
+            if not path or is_excluded(path, exclude_folders, exclude_extensions):
+                continue
+            try:
+                files[path] = tar.extractfile(member).read().decode('utf-8')
+            except UnicodeDecodeError:
+                failed_files.append(path)
+    return {"status": "success", "files": files, "failed_files": failed_files}
+
+
+def load_repo_archive(repo: str, owner: str,
+    ref: Optional[str] = None,
+    exclude_folders: Optional[Set[str]] = None,
+    exclude_extensions: Optional[Set[str]] = None
+) -> dict:
+    """
+    Download the repository tarball (default branch unless `ref` is given) in a single
+    streamed request and decompress it on the fly, applying the list_files filters.
+    Returns {"status", "files": {path: content}, "failed_files": [...]}.
+    """
+    headers = {"Accept": "application/vnd.github+json"}
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"token {GITHUB_TOKEN}"
+    url = f"{GITHUB_API_URL}/repos/{owner}/{repo}/tarball"
+    if ref:
+        url += f"/{quote(ref)}"
+    try:
+        with get_http_session().get(url, headers=headers, stream=True, timeout=GITHUB_FETCH_TIMEOUT) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            # GitHub archives nest everything under "{owner}-{repo}-{sha}/"
+            result = _read_tar_stream(
+                response.raw, "r|gz", strip_components=1,
+                exclude_folders=DEFAULT_EXCLUDE_FOLDERS if exclude_folders is None else exclude_folders,
+                exclude_extensions=DEFAULT_EXCLUDE_EXTENSIONS if exclude_extensions is None else exclude_extensions,
+            )
+        logger.info(f"[load_repo_archive] Read {len(result['files'])} files from {owner}/{repo} archive")
+        return result
+    except Exception as e:
+        logger.error(f"[load_repo_archive] Failed to download archive for {owner}/{repo}: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+def _common_prefix_depth(names) -> int:
+    """1 if every entry sits under a single top-level directory (as in GitHub archives), else 0."""
+    tops = {name.split('/', 1)[0] for name in names}
+    return 1 if len(tops) == 1 and all('/' in name for name in names) else 0
+
+
+def load_local_source(source_path: str,
+    exclude_folders: Optional[Set[str]] = None,
+    exclude_extensions: Optional[Set[str]] = None
+) -> dict:
+    """
+    Load a repository from a local .tar/.tar.gz/.tgz/.zip archive or a local checkout
+    directory, without any network access. A single wrapping top-level directory in
+    an archive is stripped. Checkouts use `git ls-files` when available so ignored
+    files are skipped.
+    """
+    if exclude_folders is None:
+        exclude_folders = DEFAULT_EXCLUDE_FOLDERS
+    if exclude_extensions is None:
+        exclude_extensions = DEFAULT_EXCLUDE_EXTENSIONS
+    try:
+        if os.path.isdir(source_path):
+            return _read_checkout(source_path, exclude_folders, exclude_extensions)
+
+        if zipfile.is_zipfile(source_path):
+            files = {}
+            failed_files = []
+            with zipfile.ZipFile(source_path) as zf:
+                infos = [info for info in zf.infolist() if not info.is_dir()]
+                strip = _common_prefix_depth([info.filename for info in infos])
+                for info in infos:
+                    path = _strip_components(info.filename, strip)
+                    if not path or is_excluded(path, exclude_folders, exclude_extensions):
+                        continue
+                    try:
+                        files[path] = zf.read(info).decode('utf-8')
+                    except UnicodeDecodeError:
+                        failed_files.append(path)
+            return {"status": "success", "files": files, "failed_files": failed_files}
+
+        if tarfile.is_tarfile(source_path):
+            with open(source_path, 'rb') as f:
+                return _read_tar_stream(f, "r|*", None, exclude_folders, exclude_extensions)
+
+        return {"status": "error", "message": f"Unsupported source: {source_path}"}
+    except Exception as e:
+        logger.error(f"[load_local_source] Failed to read {source_path}: {e}")
+        return {"status": "error", "message": str(e)}
+
+
+def _read_checkout(root: str, exclude_folders: Set[str], exclude_extensions: Set[str]) -> dict:
+    paths = None
+    if os.path.isdir(os.path.join(root, '.git')):
+        try:
+            out = subprocess.run(['git', '-C', root, 'ls-files', '-z'], capture_output=True, check=True)
+            paths = [p for p in out.stdout.decode('utf-8').split('\0') if p]
+        except (OSError, subprocess.CalledProcessError) as e:
+            logger.warning(f"[load_local_source] git ls-files failed in {root}, walking directory instead: {e}")
+    if paths is None:
+        paths = []
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if d != '.git']
+            rel = os.path.relpath(dirpath, root)
+            for name in filenames:
+                paths.append(name if rel == '.' else f"{rel}/{name}".replace(os.sep, '/'))
+
+    files = {}
+    failed_files = []
+    real_root = os.path.realpath(root)
+    for path in paths:
+        if is_excluded(path, exclude_folders, exclude_extensions):
+            continue
+        full_path = os.path.join(root, path)
+        if not os.path.isfile(full_path):
+            continue
+        # Skip symlinks that point outside the checkout
+        if os.path.commonpath([real_root, os.path.realpath(full_path)]) != real_root:
+            logger.warning(f"[load_local_source] Skipping {path}: resolves outside {root}")
+            continue
+        try:
+            with open(full_path, 'rb') as f:
+                files[path] = f.read().decode('utf-8')
+        except UnicodeDecodeError:
+            failed_files.append(path)
+    return {"status": "success", "files": files, "failed_files": failed_files}
+
+
+class GitHubRateLimiter:
+    """
+    Shared pacing state for concurrent GitHub requests.
+    Reads the X-RateLimit-* / Retry-After headers of every response and pauses
+    all fetchers together when the budget is exhausted or nearly so.
+    """
+    def __init__(self, base_backoff: float = 0.5, max_backoff: float = 60.0):
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._resume_at = 0.0
+        self.remaining = None
+        self.reset_at = None
+
+    async def wait(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def _pause(self, seconds: float):
+        seconds = min(max(seconds, 0.0), self.max_backoff)
+        self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+    def update(self, response: httpx.Response):
+        """Record the rate-limit budget reported by a response and slow down as it runs low."""
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            self.remaining = int(remaining)
+            self.reset_at = float(reset)
+        except ValueError:
+            return
+        until_reset = self.reset_at - time.time()
+        if self.remaining == 0:
+            self._pause(until_reset)
+        elif self.remaining < GITHUB_FETCH_CONCURRENCY and until_reset > 0:
+            # Spread what is left of the budget over the rest of the window
+            self._pause(until_reset / self.remaining)
+
+    def backoff(self, response: Optional[httpx.Response], attempt: int) -> float:
+        """Pause all fetchers after a throttled or failed request and return the delay used."""
+        delay = None
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after is not None:
+                try:
+                    delay = float(retry_after)
+                except ValueError:
+                    delay = None
+            elif response.headers.get("X-RateLimit-Remaining") == "0":
+                try:
+                    delay = float(response.headers.get("X-RateLimit-Reset")) - time.time()
+                except (TypeError, ValueError):
+                    delay = None
+        if delay is None:
+            delay = self.base_backoff * (2 ** attempt) + random.uniform(0, self.base_backoff)
+        self._pause(delay)
+        return min(max(delay, 0.0), self.max_backoff)
+
+
+def _is_retryable(response: httpx.Response) -> bool:
+    if response.status_code in (429, 500, 502, 503, 504):
+        return True
+    # GitHub signals primary and secondary rate limits with 403
+    return response.status_code == 403 and (
+        response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers
+    )
+
+
+async def _fetch_one(client: httpx.AsyncClient, limiter: GitHubRateLimiter, semaphore: asyncio.Semaphore,
+                     repo: str, owner: str, file_path: str, max_retries: int,
+                     sha: Optional[str] = None, cache: Optional[BlobCache] = None) -> dict:
+    start = time.perf_counter()
+    if cache is not None:
+        # Disk reads/writes go to a worker thread so they do not stall the event loop
+        cached = await asyncio.to_thread(cache.get, sha)
+        if cached is not None:
+            return {"status": "success", "content": cached, "sha": sha,
+                    "elapsed": time.perf_counter() - start, "attempts": 0}
+
+    url = f"/repos/{owner}/{repo}/contents/{quote(file_path)}"
+    attempt = 0
+    async with semaphore:
+        while True:
+            await limiter.wait()
+            response = None
+            try:
+                response = await client.get(url)
+                limiter.update(response)
+                if not _is_retryable(response):
+                    response.raise_for_status()
+                    body = response.json()
+                    decoded_content = base64.b64decode(body.get('content', '')).decode('utf-8')
+                    sha = body.get('sha') or sha
+                    if cache is not None:
+                        await asyncio.to_thread(cache.put, sha, decoded_content)
+                    return {"status": "success", "content": decoded_content, "sha": sha,
+                            "elapsed": time.perf_counter() - start, "attempts": attempt + 1}
+                error = f"HTTP {response.status_code}"
+            except httpx.TransportError as e:
+                error = str(e) or type(e).__name__
+            except Exception as e:
+                return {"status": "error", "message": str(e),
+                        "elapsed": time.perf_counter() - start, "attempts": attempt + 1}
+
+            if attempt >= max_retries:
+                return {"status": "error", "message": f"Giving up after {attempt + 1} attempts: {error}",
+                        "elapsed": time.perf_counter() - start, "attempts": attempt + 1}
+            delay = limiter.backoff(response, attempt)
+            logger.warning(f"[fetch_file_contents_async] {file_path}: {error}, retrying in {delay:.2f}s")
+            attempt += 1
+
+
+async def fetch_file_contents_async(repo: str, owner: str, file_paths: Iterable[str],
+    concurrency: Optional[int] = None,
+    base_url: Optional[str] = None,
+    max_retries: Optional[int] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    shas: Optional[dict] = None,
+    cache: Optional[BlobCache] = None,
+    progress: Optional[Callable[[int, int], None]] = None
+) -> dict:
+    """
+    Fetch many files concurrently through one pooled connection set.
+    At most `concurrency` requests are in flight; GitHub rate-limit headers pause
+    and pace all workers together. `base_url` lets the fetcher target a stub server.
+    With `shas` (file_path -> blob SHA, as returned by list_files) and a `cache`,
+    files whose blob is already cached are served from disk without a request.
+    Returns a dict of file_path -> get_file_contents-style result with `sha`,
+    `elapsed` (seconds) and `attempts` (0 for cache hits) added.
+    `progress`, if given, is called with (files_done, files_total) as files complete.
+    """
+    shas = shas or {}
+    concurrency = concurrency or GITHUB_FETCH_CONCURRENCY
+    max_retries = GITHUB_FETCH_MAX_RETRIES if max_retries is None else max_retries
+    file_paths = list(file_paths)
+    semaphore = asyncio.Semaphore(concurrency)
+    limiter = GitHubRateLimiter()
+
+    owns_client = client is None
+    if owns_client:
+        headers = {"Accept": "application/vnd.github+json"}
+        if GITHUB_TOKEN:
+            headers["Authorization"] = f"token {GITHUB_TOKEN}"
+        client = httpx.AsyncClient(
+            base_url=base_url or GITHUB_API_URL,
+            headers=headers,
+            timeout=GITHUB_FETCH_TIMEOUT,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+    done = 0
+
+    async def fetch(path):
+        nonlocal done
+        result = await _fetch_one(client, limiter, semaphore, repo, owner, path, max_retries, shas.get(path), cache)
+        done += 1
+        if progress:
+            progress(done, len(file_paths))
+        return result
+
+    try:
+        results = await asyncio.gather(*(fetch(path) for path in file_paths))
+    finally:
+        if owns_client:
+            await client.aclose()
+    return dict(zip(file_paths, results))
+
 '''
 def save_selected_files(files: list[str], tool_context: ToolContext) -> dict:
     tool_context.state["selected_files_list"] = files
@@ -0,0 +1,74 @@
+import threading
+import httpx
+import requests
+from typing import Optional
+from src.backend.config import (
+    HTTP_POOL_SIZE, GITHUB_TOKEN, GITHUB_API_URL, GITHUB_FETCH_CONCURRENCY, GITHUB_FETCH_TIMEOUT
+)
+
+# Process-wide HTTP clients, created on first use and shared by every request so
+# connections (and TLS sessions) are reused instead of being set up per call.
+_session: Optional[requests.Session] = None
+_async_client: Optional[httpx.AsyncClient] = None
+_github_client: Optional[httpx.AsyncClient] = None
+_lock = threading.Lock()
+
+
+def get_http_session() -> requests.Session:
+    """
+    Shared requests.Session for blocking code running in worker threads
+    (embedding batches, GitHub tree listing and archive downloads).
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=HTTP_POOL_SIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """
+    Shared httpx.AsyncClient for non-blocking calls from request handlers (e.g. query embeddings).
+    """
+    global _async_client
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+        )
+    return _async_client
+
+
+def get_github_client() -> httpx.AsyncClient:
+    """
+    Shared httpx.AsyncClient bound to the GitHub API (auth headers, base URL and a
+    connection pool sized for GITHUB_FETCH_CONCURRENCY).
+    """
+    global _github_client
+    if _github_client is None:
+        headers = {"Accept": "application/vnd.github+json"}
+        if GITHUB_TOKEN:
+            headers["Authorization"] = f"token {GITHUB_TOKEN}"
+        _github_client = httpx.AsyncClient(
+            base_url=GITHUB_API_URL,
+            headers=headers,
+            timeout=GITHUB_FETCH_TIMEOUT,
+            limits=httpx.Limits(max_connections=GITHUB_FETCH_CONCURRENCY,
+                                max_keepalive_connections=GITHUB_FETCH_CONCURRENCY),
+        )
+    return _github_client
+
+
+async def close_http_clients():
+    """
+    Close the shared clients (called on app shutdown).
+    """
+    global _session, _async_client, _github_client
+    for client in (_async_client, _github_client):
+        if client is not None:
+            await client.aclose()
+    if _session is not None:
+        _session.close()
+    _session = _async_client = _github_client = None
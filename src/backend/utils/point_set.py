@@ -0,0 +1,171 @@
+import os
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def dirpath_of(filepath: str) -> str:
+    # Top two path components ("src/backend/x.py" -> "src/backend"), used to group files
+    parts = filepath.split("/")
+    return "/".join(parts[:2]) if len(parts) > 1 else parts[0]
+
+
+class ChunkMeta:
+    """
+    View of one row of a PointSet. Reads like the per-point meta dicts it replaces
+    (meta["filepath"], meta.get("payload", {}), ...) without copying anything.
+    """
+    __slots__ = ("points", "index")
+
+    FIELDS = ("id", "filepath", "dirpath", "filename", "payload", "vector", "cluster_id", "distance_to_centroid")
+
+    def __init__(self, points: "PointSet", index: int):
+        self.points = points
+        self.index = index
+
+    @property
+    def id(self):
+        return self.points.ids[self.index]
+
+    @property
+    def filepath(self) -> str:
+        return self.points.filepaths[self.points.file_idx[self.index]]
+
+    @property
+    def dirpath(self) -> str:
+        return self.points.dirpaths[self.points.dir_idx[self.index]]
+
+    @property
+    def filename(self) -> str:
+        return os.path.basename(self.filepath)
+
+    @property
+    def payload(self) -> Dict[str, Any]:
+        return self.points.payloads[self.index]
+
+    @property
+    def vector(self) -> np.ndarray:
+        return self.points.X[self.index]
+
+    @property
+    def cluster_id(self) -> Optional[int]:
+        if self.points.cluster_ids is None:
+            return None
+        return int(self.points.cluster_ids[self.index])
+
+    @property
+    def distance_to_centroid(self) -> Optional[float]:
+        if self.points.distances is None:
+            return None
+        return float(self.points.distances[self.index])
+
+    def __getitem__(self, key: str):
+        if key not in self.FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key: str, default=None):
+        value = getattr(self, key, None) if key in self.FIELDS else None
+        return default if value is None else value
+
+    def __repr__(self):
+        return f"ChunkMeta(id={self.id!r}, filepath={self.filepath!r})"
+
+
+class PointSet:
+    """
+    Columnar set of points for clustering and the atlas: one contiguous float32 matrix X,
+    ids and payloads in row order, and int32 file/dir indices into interned path lists
+    (each distinct path is stored once). Cluster labels and distances are filled in by
+    with_clusters(). Indexing or iterating yields ChunkMeta views.
+    """
+    def __init__(self, ids: Sequence, X: np.ndarray, payloads: List[Dict[str, Any]]):
+        self.ids = list(ids)
+        self.X = np.ascontiguousarray(X, dtype=np.float32)
+        if self.X.ndim == 1:
+            self.X = self.X.reshape(-1, 1)
+        self.payloads = payloads
+        file_index = {}
+        self.file_idx = np.fromiter(
+            (file_index.setdefault(payload.get("filepath", ""), len(file_index)) for payload in payloads),
+            dtype=np.int32, count=len(payloads)
+        )
+        self.filepaths = list(file_index)
+        dir_index = {}
+        file_dirs = np.fromiter((dir_index.setdefault(dirpath_of(fp), len(dir_index)) for fp in self.filepaths),
+                                dtype=np.int32, count=len(self.filepaths))
+        self.dirpaths = list(dir_index)
+        self.dir_idx = file_dirs[self.file_idx] if len(self.file_idx) else np.zeros(0, dtype=np.int32)
+        self.cluster_ids = None
+        self.distances = None
+
+    @classmethod
+    def from_points(cls, points: List) -> "PointSet":
+        """
+        Build from Qdrant points ({"id", "payload", "vector"} dicts or Records), skipping
+        points without a usable vector.
+        """
+        ids, vectors, payloads = [], [], []
+        for idx, pt in enumerate(points):
+            if isinstance(pt, dict):
+                vector, payload, point_id = pt.get("vector"), pt.get("payload") or {}, pt.get("id")
+            elif hasattr(pt, "vector") and hasattr(pt, "payload"):
+                vector, payload, point_id = pt.vector, pt.payload or {}, getattr(pt, "id", None)
+            else:
+                logger.warning(f"[PointSet] Skipping point {idx}: unrecognized type {type(pt)}")
+                continue
+            if vector is None or not isinstance(vector, (list, tuple, np.ndarray)) or len(vector) == 0:
+                logger.warning(f"[PointSet] Skipping point {idx}: missing or invalid vector")
+                continue
+            ids.append(point_id)
+            vectors.append(vector)
+            payloads.append(payload)
+        X = np.asarray(vectors, dtype=np.float32) if vectors else np.empty((0, 0), dtype=np.float32)
+        return cls(ids, X, payloads)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index: int) -> ChunkMeta:
+        if not -len(self) <= index < len(self):
+            raise IndexError(index)
+        return ChunkMeta(self, index % len(self))
+
+    def __iter__(self):
+        return (ChunkMeta(self, i) for i in range(len(self)))
+
+    @property
+    def n_files(self) -> int:
+        return len(self.filepaths)
+
+    def normalize(self) -> "PointSet":
+        """
+        L2-normalize the rows of X in place.
+        """
+        if self.X.size:
+            norms = np.sqrt(np.einsum("ij,ij->i", self.X, self.X))[:, None]
+            np.divide(self.X, np.clip(norms, 1e-8, None), out=self.X)
+        return self
+
+    def with_clusters(self, labels: np.ndarray, distances: np.ndarray) -> "PointSet":
+        """
+        Shallow copy sharing X, ids and payloads, with cluster labels and distances set.
+        """
+        clustered = object.__new__(PointSet)
+        clustered.__dict__.update(self.__dict__)
+        clustered.cluster_ids = np.asarray(labels, dtype=np.int32)
+        clustered.distances = np.asarray(distances, dtype=np.float32)
+        return clustered
+
+    def rows_for_file(self, filepath: str) -> np.ndarray:
+        try:
+            file_id = self.filepaths.index(filepath)
+        except ValueError:
+            return np.zeros(0, dtype=np.int64)
+        return np.flatnonzero(self.file_idx == file_id)
+
+    def for_file(self, filepath: str) -> List[ChunkMeta]:
+        return [ChunkMeta(self, int(i)) for i in self.rows_for_file(filepath)]
@@ -0,0 +1,387 @@
+import time
+import uuid
+import random
+import hashlib
+import logging
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+from qdrant_client.models import (
+    Batch, CreateAlias, CreateAliasOperation, DeleteAlias, DeleteAliasOperation,
+    VectorParams, Distance, HnswConfigDiff, PayloadSchemaType,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType,
+    ProductQuantization, ProductQuantizationConfig, CompressionRatio
+)
+from src.backend.config import (
+    QDRANT_UPSERT_BATCH_SIZE, QDRANT_UPSERT_PARALLEL, QDRANT_UPSERT_WAIT, QDRANT_UPSERT_MAX_RETRIES,
+    QDRANT_KEEP_OLD_VERSIONS, QDRANT_SCROLL_PAGE_SIZE, QDRANT_HNSW_M, QDRANT_HNSW_EF_CONSTRUCT, QDRANT_QUANTIZATION,
+    QDRANT_PQ_COMPRESSION, QDRANT_QUANTIZATION_ALWAYS_RAM, QDRANT_ON_DISK_VECTORS, QDRANT_ON_DISK_PAYLOAD,
+    EMBEDDING_DIM
+)
+
+logger = logging.getLogger(__name__)
+
+# Fixed namespace so the same chunk maps to the same point id on every ingest
+POINT_ID_NAMESPACE = uuid.UUID("6f1c1d3e-8f3b-5a8e-9a57-2b1f0c4d7e90")
+
+
+# Payload fields the app filters or groups on: SearchService.build_filter (repo_id, filepath),
+# incremental ingest (filepath, file_hash) and the atlas/summary code (filepath, cluster_id)
+PAYLOAD_INDEXES = {
+    "repo_id": PayloadSchemaType.KEYWORD,
+    "filepath": PayloadSchemaType.KEYWORD,
+    "file_hash": PayloadSchemaType.KEYWORD,
+    "cluster_id": PayloadSchemaType.INTEGER,
+}
+
+
+def quantization_config(mode: str = QDRANT_QUANTIZATION, always_ram: bool = QDRANT_QUANTIZATION_ALWAYS_RAM):
+    """
+    Build the quantization config for `mode` (none, scalar or product).
+    """
+    if mode in ("", "none"):
+        return None
+    if mode == "scalar":
+        return ScalarQuantization(scalar=ScalarQuantizationConfig(
+            type=ScalarType.INT8, quantile=0.99, always_ram=always_ram
+        ))
+    if mode == "product":
+        return ProductQuantization(product=ProductQuantizationConfig(
+            compression=CompressionRatio(QDRANT_PQ_COMPRESSION), always_ram=always_ram
+        ))
+    raise ValueError(f"Unknown QDRANT_QUANTIZATION mode: {mode}")
+
+
+def ensure_payload_indexes(client, collection_name: str):
+    """
+    Create the payload indexes in PAYLOAD_INDEXES (idempotent, so it is safe to call on
+    existing collections).
+    """
+    for field_name, schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(collection_name=collection_name, field_name=field_name, field_schema=schema)
+
+
+def get_vector_size(client, collection_name: str) -> Optional[int]:
+    """
+    Vector size of an existing (single unnamed vector) collection, or None.
+    """
+    vectors = client.get_collection(collection_name=collection_name).config.params.vectors
+    return getattr(vectors, "size", None)
+
+
+def ensure_collection(client, collection_name: str, vector_size: int = EMBEDDING_DIM) -> bool:
+    """
+    Create `collection_name` if it does not exist, with the HNSW, quantization and
+    on-disk settings from config, then make sure its payload indexes exist.
+    Returns True if the collection was created.
+    """
+    created = False
+    if not client.collection_exists(collection_name=collection_name):
+        client.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE, on_disk=QDRANT_ON_DISK_VECTORS),
+            hnsw_config=HnswConfigDiff(m=QDRANT_HNSW_M, ef_construct=QDRANT_HNSW_EF_CONSTRUCT),
+            quantization_config=quantization_config(),
+            on_disk_payload=QDRANT_ON_DISK_PAYLOAD
+        )
+        created = True
+        logger.info(
+            f"[ensure_collection] Created {collection_name} (size={vector_size}, m={QDRANT_HNSW_M}, "
+            f"ef_construct={QDRANT_HNSW_EF_CONSTRUCT}, quantization={QDRANT_QUANTIZATION}, "
+            f"on_disk_vectors={QDRANT_ON_DISK_VECTORS})"
+        )
+    ensure_payload_indexes(client, collection_name)
+    return created
+
+
+def point_id_for(repo_id: str, metadata: dict) -> str:
+    """
+    Deterministic point id for a chunk: uuid5 of (repo, file path, line span, content hash).
+    Re-upserting an unchanged chunk overwrites its existing point instead of adding a
+    duplicate, and ids can be compared across ingests to see what changed.
+    """
+    content = metadata.get("excerpt") or ""
+    content_hash = hashlib.sha256(content.encode("utf-8", errors="replace")).hexdigest()
+    key = "\x1f".join([
+        str(repo_id),
+        str(metadata.get("filepath", "")),
+        str(metadata.get("start_line_no", "")),
+        str(metadata.get("end_line_no", "")),
+        content_hash,
+    ])
+    return str(uuid.uuid5(POINT_ID_NAMESPACE, key))
+
+
+def list_point_ids(client, collection_name: str, page_size: int = 1000) -> set:
+    """
+    Page through a collection and return the ids of all its points (no payloads or vectors).
+    """
+    ids = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False
+        )
+        ids.update(str(pt.id) for pt in points)
+        if offset is None:
+            return ids
+
+
+def scroll_points(client, collection_name: str, payload_fields: Optional[list] = None,
+                  page_size: int = QDRANT_SCROLL_PAGE_SIZE, scroll_filter=None,
+                  progress: Optional[Callable[[int, int], None]] = None):
+    """
+    Read every point of a collection page by page. Vectors are copied straight into a
+    float32 matrix preallocated from the point count (grown if points are added during
+    the read), so only one page of Record objects is alive at a time. `payload_fields`
+    limits the payload keys fetched; `progress` gets (points_read, points_total).
+    Returns (ids, X, payloads) with X of shape (n, dim).
+    """
+    total = client.count(collection_name=collection_name, count_filter=scroll_filter, exact=True).count
+    dim = get_vector_size(client, collection_name)
+    X = np.empty((total, dim), dtype=np.float32)
+    ids, payloads = [], []
+    n = 0
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            scroll_filter=scroll_filter,
+            limit=page_size,
+            offset=offset,
+            with_payload=payload_fields or True,
+            with_vectors=True
+        )
+        if n + len(points) > len(X):
+            grown = np.empty((max(2 * len(X), n + len(points)), dim), dtype=np.float32)
+            grown[:n] = X[:n]
+            X = grown
+        for pt in points:
+            X[n] = pt.vector
+            ids.append(pt.id)
+            payloads.append(pt.payload or {})
+            n += 1
+        if progress:
+            progress(n, max(total, n))
+        if offset is None:
+            break
+    logger.info(f"[scroll_points] Read {n} points from {collection_name} in pages of {page_size}")
+    return ids, X[:n], payloads
+
+
+def retrieve_points(client, collection_name: str, point_ids: list, payload_fields: Optional[list] = None,
+                    page_size: int = QDRANT_SCROLL_PAGE_SIZE):
+    """
+    Fetch the given points (in pages of `page_size` ids) with their vectors, in the order
+    of `point_ids`; ids that no longer exist are left out. Same return shape as
+    scroll_points: (ids, X, payloads).
+    """
+    dim = get_vector_size(client, collection_name)
+    records = {}
+    for start in range(0, len(point_ids), page_size):
+        for record in client.retrieve(collection_name=collection_name, ids=point_ids[start:start + page_size],
+                                      with_payload=payload_fields or True, with_vectors=True):
+            if record.vector is not None:
+                records[str(record.id)] = record
+    ids, payloads = [], []
+    X = np.empty((len(records), dim), dtype=np.float32)
+    for point_id in point_ids:
+        record = records.get(str(point_id))
+        if record is None:
+            continue
+        X[len(ids)] = record.vector
+        ids.append(record.id)
+        payloads.append(record.payload or {})
+    return ids, X[:len(ids)], payloads
+
+
+def versioned_collection_name(alias: str) -> str:
+    """
+    Name for a new physical collection behind `alias`, e.g. repo_x__v1718000000000.
+    """
+    return f"{alias}__v{int(time.time() * 1000)}"
+
+
+def _version_of(alias: str, collection_name: str) -> Optional[int]:
+    prefix = f"{alias}__v"
+    suffix = collection_name[len(prefix):]
+    if collection_name.startswith(prefix) and suffix.isdigit():
+        return int(suffix)
+    return None
+
+
+def get_alias_target(client, alias: str) -> Optional[str]:
+    """
+    Return the collection `alias` currently points at, or None if there is no such alias.
+    """
+    for description in client.get_aliases().aliases:
+        if description.alias_name == alias:
+            return description.collection_name
+    return None
+
+
+def swap_alias(client, alias: str, collection_name: str) -> Optional[str]:
+    """
+    Point `alias` at `collection_name` in a single alias update, so readers switch from
+    the old collection to the new one atomically. Returns the previous target.
+    A pre-alias collection that is itself named `alias` has to be deleted first (an alias
+    cannot shadow a collection), which leaves a brief gap the first time only.
+    Raises ValueError instead of moving the alias back to a version older than the one
+    it points at, which a build that started earlier but finished later would do.
+    """
+    previous = get_alias_target(client, alias)
+    previous_version = _version_of(alias, previous) if previous else None
+    new_version = _version_of(alias, collection_name)
+    if previous_version is not None and new_version is not None and new_version < previous_version:
+        raise ValueError(f"{alias} already points at {previous}, which is newer than {collection_name}")
+    operations = []
+    if previous is not None:
+        operations.append(DeleteAliasOperation(delete_alias=DeleteAlias(alias_name=alias)))
+    elif client.collection_exists(collection_name=alias):
+        logger.warning(f"[swap_alias] Replacing legacy collection {alias} with an alias to {collection_name}")
+        client.delete_collection(collection_name=alias)
+        previous = alias
+    operations.append(CreateAliasOperation(create_alias=CreateAlias(collection_name=collection_name, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=operations)
+    logger.info(f"[swap_alias] {alias} -> {collection_name} (was {previous})")
+    return previous
+
+
+def gc_collection_versions(client, alias: str, keep: int = QDRANT_KEEP_OLD_VERSIONS) -> list:
+    """
+    Delete superseded `{alias}__v*` collections, keeping the one the alias points at and
+    the `keep` most recent older versions. Versions newer than the live one are left
+    alone, since they may belong to an ingest that is still running.
+    Returns the deleted collection names.
+    """
+    current = get_alias_target(client, alias)
+    current_version = _version_of(alias, current) if current else None
+    if current_version is None:
+        return []
+    older = sorted(
+        (c.name for c in client.get_collections().collections
+         if (_version_of(alias, c.name) or current_version) < current_version),
+        key=lambda name: _version_of(alias, name),
+        reverse=True
+    )
+    deleted = []
+    for name in older[keep:]:
+        client.delete_collection(collection_name=name)
+        deleted.append(name)
+    if deleted:
+        logger.info(f"[gc_collection_versions] Deleted old versions of {alias}: {deleted}")
+    return deleted
+
+
+class QdrantBulkWriter:
+    """
+    Streams points into a collection in fixed-size batches uploaded by a small pool of
+    threads. Vectors are buffered in one preallocated float32 matrix per batch instead of
+    per-point Python float lists, at most `parallel` batches are in flight, and each
+    failed batch is retried on its own. With wait=False Qdrant acknowledges batches
+    before they are indexed.
+
+    Usage:
+        with QdrantBulkWriter(client, "repo_x") as writer:
+            writer.add(point_id, vector, payload)
+    """
+    def __init__(self, client, collection_name: str,
+                 batch_size: int = QDRANT_UPSERT_BATCH_SIZE,
+                 parallel: int = QDRANT_UPSERT_PARALLEL,
+                 wait: bool = QDRANT_UPSERT_WAIT,
+                 max_retries: int = QDRANT_UPSERT_MAX_RETRIES):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.wait = wait
+        self.max_retries = max_retries
+        self.points_written = 0
+        self.batches_written = 0
+        self.retries = 0
+        self._pool = ThreadPoolExecutor(max_workers=max(1, parallel), thread_name_prefix="qdrant-upsert")
+        self._in_flight = threading.BoundedSemaphore(max(1, parallel))
+        self._futures = []
+        self._lock = threading.Lock()
+        self._reset_buffer(dim=None)
+
+    def _reset_buffer(self, dim):
+        self._ids = []
+        self._payloads = []
+        self._vectors = np.empty((self.batch_size, dim), dtype=np.float32) if dim else None
+
+    def add(self, point_id, vector, payload: dict):
+        if self._vectors is None:
+            self._reset_buffer(dim=len(vector))
+        self._vectors[len(self._ids)] = vector
+        self._ids.append(point_id)
+        self._payloads.append(payload)
+        if len(self._ids) == self.batch_size:
+            self._submit()
+
+    def _submit(self):
+        if not self._ids:
+            return
+        ids, payloads, vectors = self._ids, self._payloads, self._vectors[:len(self._ids)]
+        self._reset_buffer(dim=vectors.shape[1])
+        # Blocks once `parallel` batches are in flight, which bounds buffered memory
+        self._in_flight.acquire()
+        self._futures.append(self._pool.submit(self._upload, ids, vectors, payloads))
+
+    def _upload(self, ids, vectors, payloads):
+        try:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self.client.upsert(
+                        collection_name=self.collection_name,
+                        points=Batch(ids=ids, vectors=vectors.tolist(), payloads=payloads),
+                        wait=self.wait
+                    )
+                    with self._lock:
+                        self.points_written += len(ids)
+                        self.batches_written += 1
+                    return
+                except Exception as e:
+                    if attempt == self.max_retries:
+                        raise
+                    delay = 0.5 * (2 ** attempt) + random.uniform(0, 0.5)
+                    with self._lock:
+                        self.retries += 1
+                    logger.warning(f"[QdrantBulkWriter] Batch of {len(ids)} failed ({e}), retrying in {delay:.2f}s")
+                    time.sleep(delay)
+        finally:
+            self._in_flight.release()
+
+    def flush(self):
+        """
+        Send any partial batch and wait for all uploads; raises the first upload error.
+        """
+        self._submit()
+        futures, self._futures = self._futures, []
+        for future in futures:
+            future.result()
+
+    def shutdown(self):
+        """
+        Stop the upload threads without sending the partial batch (used after a failure).
+        """
+        self._pool.shutdown(wait=True)
+
+    def close(self):
+        try:
+            self.flush()
+        finally:
+            self.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.shutdown()
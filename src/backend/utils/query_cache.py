@@ -0,0 +1,64 @@
+import time
+import threading
+from collections import OrderedDict
+from typing import List, Optional
+
+
+class QueryEmbeddingCache:
+    """
+    In-memory LRU cache of query embeddings with a time-to-live. Sits in front of the
+    network (and the persistent EmbeddingCache) so repeated searches skip the embedding
+    round-trip entirely.
+    """
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        # Lookups that waited on an identical in-flight request (see SearchService.embed_query)
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # query -> (expires_at, vector), least recently used first
+
+    def get(self, query: str) -> Optional[List[float]]:
+        with self._lock:
+            entry = self._entries.get(query)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[query]
+                self.expired += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(query)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, query: str, vector: List[float]):
+        if self.max_entries <= 0 or not vector:
+            return
+        with self._lock:
+            self._entries[query] = (time.monotonic() + self.ttl_seconds, vector)
+            self._entries.move_to_end(query)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                # Share of lookups that needed no network call (cache hits + coalesced waits)
+                "saved_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else None
+            }
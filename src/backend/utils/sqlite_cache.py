@@ -0,0 +1,120 @@
+import os
+import time
+import sqlite3
+import threading
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# SQLite's default limit on bound parameters is 999 in older builds
+_SQL_BATCH = 500
+
+
+class SQLiteLRUCache:
+    """
+    Size-bounded key -> bytes store in a single SQLite file (WAL mode).
+    Once stored values exceed max_bytes the least recently used entries are evicted.
+    Subclasses add typed encode/decode on top of get_many/put_many.
+    """
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, nbytes INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries(last_used)")
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(nbytes), 0) FROM entries").fetchone()[0]
+
+    def get_many_bytes(self, keys: List[str]) -> Dict[str, bytes]:
+        """
+        Look up keys; returns key -> value for hits and refreshes their recency.
+        """
+        unique_keys = list(dict.fromkeys(keys))
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(unique_keys), _SQL_BATCH):
+                batch = unique_keys[i:i + _SQL_BATCH]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+                if rows:
+                    self._conn.executemany(
+                        "UPDATE entries SET last_used = ? WHERE key = ?", [(now, key) for key, _ in rows]
+                    )
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many_bytes(self, items: Dict[str, bytes]):
+        now = time.time()
+        rows = [(key, value, len(value), now) for key, value in items.items()]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for i in range(0, len(rows), _SQL_BATCH):
+                    batch = rows[i:i + _SQL_BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    replaced = self._conn.execute(
+                        f"SELECT COALESCE(SUM(nbytes), 0) FROM entries WHERE key IN ({placeholders})",
+                        [row[0] for row in batch]
+                    ).fetchone()[0]
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO entries (key, value, nbytes, last_used) VALUES (?, ?, ?, ?)", batch
+                    )
+                    self._total_bytes += sum(row[2] for row in batch) - replaced
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._evict()
+
+    def _evict(self):
+        if self._total_bytes <= self.max_bytes:
+            return
+        # Drop the least recently used ~10% below the limit so eviction is not triggered on every put
+        target = int(self.max_bytes * 0.9)
+        while self._total_bytes > target:
+            rows = self._conn.execute(
+                "SELECT key, nbytes FROM entries ORDER BY last_used LIMIT ?", (_SQL_BATCH,)
+            ).fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            victims = []
+            for key, nbytes in rows:
+                if self._total_bytes <= target:
+                    break
+                victims.append((key,))
+                self._total_bytes -= nbytes
+            self._conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            self.evictions += len(victims)
+        logger.info(f"[{type(self).__name__}] Evicted down to {self._total_bytes} bytes ({self.evictions} evictions total)")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+        }
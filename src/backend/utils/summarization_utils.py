@@ -1,12 +1,11 @@
 import hashlib
-import random
 from collections import defaultdict
 from typing import List, Dict, Any, Optional, Tuple
 from pydantic import Strict
 import requests
 import os
 import numpy as np
-from scipy import cluster
+from scipy import cluster, sparse
 from sklearn.cluster import KMeans
 import jsonschema
 from jsonschema import ValidationError
@@ -16,6 +15,9 @@ from umap import UMAP
 import logging
 from google import genai
 from google.genai import types
+from src.backend.utils.qdrant_utils import retrieve_points
+from src.backend.utils.point_set import PointSet, dirpath_of
+from src.backend.config import SAMPLE_WEIGHT_BY, SAMPLE_SEED, QDRANT_SCROLL_PAGE_SIZE
 
 logger = logging.getLogger(__name__)
 
@@ -85,84 +87,166 @@ def gemini_summarize(prompt: str, api_key: Optional[str] = None, model: str = "m
         return str(result)
 '''
 #groups points by filepath
-def stratified_downsample(points: List[Dict[str, Any]], n_max: int) -> List[Dict[str, Any]]:
+def _payload_of(pt) -> Dict[str, Any]:
+    # Points arrive as {"payload": ...} dicts or as Qdrant Record/ScoredPoint objects
+    if isinstance(pt, dict):
+        return pt.get("payload") or {}
+    return getattr(pt, "payload", None) or {}
+
+
+def file_strata(filepaths: List[str], weight_by: str = SAMPLE_WEIGHT_BY) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Map each point to a file stratum and weight the files for sampling.
+    weight_by: "file" (every file counts the same), "size" (proportional to the file's
+    chunk count) or "dir" (every top directory counts the same, split over its files).
+    Returns (strata, weights): an int index per point and a weight per file.
+    """
+    file_index = {}
+    strata = np.fromiter((file_index.setdefault(fp, len(file_index)) for fp in filepaths),
+                         dtype=np.int64, count=len(filepaths))
+    if weight_by == "size":
+        weights = np.bincount(strata, minlength=len(file_index)).astype(np.float64)
+    elif weight_by == "dir":
+        dir_index = {}
+        file_dirs = np.fromiter((dir_index.setdefault(dirpath_of(fp), len(dir_index)) for fp in file_index),
+                                dtype=np.int64, count=len(file_index))
+        weights = 1.0 / np.bincount(file_dirs)[file_dirs]
+    elif weight_by == "file":
+        weights = np.ones(len(file_index))
+    else:
+        raise ValueError(f"Unknown weight_by '{weight_by}' (expected file, size or dir)")
+    return strata, weights
+
+
+def _allocate(counts: np.ndarray, weights: np.ndarray, n_max: int, rng: np.random.Generator) -> np.ndarray:
+    # How many points to take from each stratum: one per stratum first (so every file is
+    # represented), then the rest proportional to weight, capped by what each stratum holds
+    alloc = (counts > 0).astype(np.int64)
+    if n_max < alloc.sum():
+        # Not even one per stratum: pick which strata get their single point, by weight
+        alloc[:] = 0
+        chosen = rng.choice(len(counts), size=n_max, replace=False, p=weights / weights.sum())
+        alloc[chosen] = 1
+        return alloc
+    remaining = n_max - int(alloc.sum())
+    while remaining > 0:
+        capacity = counts - alloc
+        open_ = (capacity > 0) & (weights > 0)
+        if not open_.any():
+            break
+        share = np.where(open_, weights, 0.0)
+        extra = np.minimum(np.floor(remaining * share / share.sum()).astype(np.int64), capacity)
+        if extra.sum() == 0:
+            # Leftover smaller than the number of open strata: one more each, heaviest first
+            top = np.argsort(-share, kind="stable")[:remaining]
+            extra = np.zeros_like(alloc)
+            extra[top[open_[top]]] = 1
+        alloc += extra
+        remaining -= int(extra.sum())
+    return alloc
+
+
+def stratified_sample_indices(strata: np.ndarray, n_max: int, weights: Optional[np.ndarray] = None,
+                              seed: int = SAMPLE_SEED) -> np.ndarray:
+    """
+    Indices of a stratified sample of at most n_max points, given the stratum of every
+    point (ints in [0, n_strata)) and an optional weight per stratum (default: equal).
+    Seeded, so the same input gives the same sample. Works on index arrays only, in a
+    handful of vectorized passes, so it scales to millions of points. Returns sorted indices.
+    """
+    strata = np.asarray(strata, dtype=np.int64)
+    n = len(strata)
+    if n <= n_max:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    counts = np.bincount(strata)
+    weights = np.ones(len(counts)) if weights is None else np.asarray(weights, dtype=np.float64)
+    alloc = _allocate(counts, np.where(counts > 0, weights, 0.0), n_max, rng)
+
+    # Shuffle, group by stratum (stable, so each group stays shuffled) and keep the
+    # first alloc[s] of every group
+    perm = rng.permutation(n)
+    grouped = perm[np.argsort(strata[perm], kind="stable")]
+    starts = np.cumsum(counts) - counts
+    rank = np.arange(n) - starts[strata[grouped]]
+    return np.sort(grouped[rank < alloc[strata[grouped]]])
+
+
+def stratified_downsample(points: List[Dict[str, Any]], n_max: int, weight_by: str = SAMPLE_WEIGHT_BY,
+                          seed: int = SAMPLE_SEED) -> List[Dict[str, Any]]:
     """
     Downsample points stratified by filepath so all files are represented.
+    Accepts {"payload": ...} dicts or Qdrant Records; see stratified_sample_indices.
     """
     if len(points) <= n_max:
         return points
-    
-    #dictionary of filepath and their points
-    by_file = defaultdict(list)
-    for pt in points:
-        fp = pt.get("payload", {}).get("filepath", "unknown")
-        by_file[fp].append(pt)
-    
-    files = list(by_file.keys())
-    quota = max(1, n_max // len(files))
-    sampled = []
-    for pts in by_file.values():
-        if len(pts) <= quota:
-            sampled.extend(pts)
-        else:
-            sampled.extend(random.sample(pts, quota))
-            
-    # If we have less than n_max, fill up with randoms from leftovers 
-    if len(sampled) < n_max:
-        leftovers = [pt for pts in by_file.values() for pt in pts if pt not in sampled]
-        sampled.extend(random.sample(leftovers, min(n_max - len(sampled), len(leftovers))))
-        
-    return sampled[:n_max]
+    strata, weights = file_strata([_payload_of(pt).get("filepath", "unknown") for pt in points], weight_by)
+    return [points[i] for i in stratified_sample_indices(strata, n_max, weights, seed)]
+
+
+# Payload keys the clustering, prompts and atlas read; everything else stays in Qdrant
+CLUSTER_PAYLOAD_FIELDS = [
+    "filepath", "excerpt", "start_line_no", "end_line_no", "line_count",
+    "ancestors", "signature", "summary"
+]
 
 
-def preprocess_points(points: List[Dict[str, Any]]):
+def load_points_for_clustering(qdrant_client, collection_name: str, max_points: int, progress=None,
+                               page_size: int = QDRANT_SCROLL_PAGE_SIZE):
     """
-    Given a list of Qdrant points, extract and L2-normalize vectors, and build meta[] with filepath, dirpath, filename.
-    Returns: X (np.ndarray), meta (List[Dict])
+    Scan the whole collection reading only ids, filepath and file_hash (no vectors),
+    hashing its contents page by page and stratify-downsampling over the full
+    population; then retrieve vectors and CLUSTER_PAYLOAD_FIELDS for the sampled ids
+    only, as a PointSet. `progress` gets (points_scanned, points_total).
+    Returns (points, population_size, content_hash).
     """
-    logger = logging.getLogger(__name__)
-    X = []
-    meta = []
-    logger.info(f"[preprocess_points] Received {len(points)} points")
-    for idx, pt in enumerate(points):
-        if isinstance(pt, dict):
-            vector = pt.get("vector")
-            payload = pt.get("payload", {})
-            point_id = pt.get("id")
-        elif hasattr(pt, "vector") and hasattr(pt, "payload"):
-            vector = pt.vector
-            payload = pt.payload
-            point_id = getattr(pt, "id", None)
-        else:
-            logger.warning(f"[preprocess_points] Skipping point {idx}: unrecognized type {type(pt)}")
-            continue
-
-        if vector is None or not isinstance(vector, (list, tuple, np.ndarray)) or len(vector) == 0:
-            logger.warning(f"[preprocess_points] Skipping point {idx}: missing or invalid vector")
-            continue
-        X.append(vector)
-        filepath = payload.get("filepath", "")
-        parts = filepath.split("/")
-        dirpath = "/".join(parts[:2]) if len(parts) > 1 else parts[0]
-        filename = os.path.basename(filepath)
-        meta.append({
-            "id": point_id,
-            "filepath": filepath,
-            "dirpath": dirpath,
-            "filename": filename,
-            "payload": payload,
-            "vector": vector 
-        })
-    if not X:
+    total = qdrant_client.count(collection_name=collection_name, exact=True).count
+    digest = hashlib.sha256()
+    ids, filepaths = [], []
+    # Each distinct path is kept once; filepaths holds references to it per point
+    interned = {}
+    offset = None
+    while True:
+        page, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=["filepath", "file_hash"],
+            with_vectors=False
+        )
+        for pt in page:
+            payload = pt.payload or {}
+            filepath = str(payload.get("filepath", "unknown"))
+            # Point ids are derived from chunk content, so id + file hash tracks every change
+            digest.update(f"{pt.id}\0{filepath}\0{payload.get('file_hash', '')}\n".encode("utf-8"))
+            ids.append(pt.id)
+            filepaths.append(interned.setdefault(filepath, filepath))
+        if progress:
+            progress(len(ids), max(total, len(ids)))
+        if offset is None:
+            break
+    logger.info(f"[load_points_for_clustering] Scanned {len(ids)} points in {len(interned)} files from {collection_name}")
+
+    strata, weights = file_strata(filepaths)
+    sample = stratified_sample_indices(strata, max_points, weights)
+    sampled_ids, X, payloads = retrieve_points(qdrant_client, collection_name, [ids[i] for i in sample],
+                                               payload_fields=CLUSTER_PAYLOAD_FIELDS, page_size=page_size)
+    return PointSet(sampled_ids, X, payloads), len(ids), digest.hexdigest()
+
+
+def preprocess_points(points):
+    """
+    Given a PointSet (or a list of Qdrant points, converted with PointSet.from_points),
+    L2-normalize its vectors in place.
+    Returns: X (float32 np.ndarray), meta (the PointSet; meta[i] has filepath, dirpath, filename, payload)
+    """
+    meta = points if isinstance(points, PointSet) else PointSet.from_points(points)
+    logger.info(f"[preprocess_points] Received {len(meta)} points")
+    if len(meta) == 0:
         # Return a 2D empty array with shape (0, 0)
-        return np.empty((0, 0)), []
-    X = np.array(X)
-    if X.ndim == 1:
-        X = X.reshape(-1, 1)
-    # L2 normalize
-    norms = np.linalg.norm(X, axis=1, keepdims=True)
-    X = X / np.clip(norms, 1e-8, None)
-    return X, meta
+        return np.empty((0, 0)), meta
+    meta.normalize()
+    return meta.X, meta
 
 
 def run_kmeans(X: np.ndarray, n_clusters: int = 10, random_state: int = 42) -> Tuple[np.ndarray, np.ndarray]:
@@ -181,36 +265,31 @@ def run_kmeans(X: np.ndarray, n_clusters: int = 10, random_state: int = 42) -> T
 
 def assign_clusters_and_scores(
     X: np.ndarray,
-    meta: List[Dict[str, Any]],
+    meta: PointSet,
     labels: np.ndarray,
     centroids: np.ndarray
-) -> Tuple[List[Dict[str, Any]], Dict[int, Dict[str, Any]]]:
+) -> Tuple[PointSet, Dict[int, Dict[str, Any]]]:
     """
-    Assigns cluster_id to each meta entry and computes distances to centroid.
+    Assigns cluster_id to each point and computes distances to centroid.
     Returns:
-        meta_with_cluster: meta list with 'cluster_id' and 'distance_to_centroid' added
+        meta_with_cluster: PointSet with cluster_ids and distances set (meta[i]["cluster_id"], ...)
         clusters: dict of cluster_id -> {centroid, member_indices, member_ids}
     """
     if X.size == 0 or labels.size == 0 or centroids.size == 0:
-        return [], {}
-
-    # centroid can be None or a numpy array
-    clusters: Dict[int, Dict[str, Any]] = defaultdict(
-        lambda: {"centroid": None, "member_indices": [], "member_ids": []}
-    )
-    meta_with_cluster = []
-
-    for i, (m, label) in enumerate(zip(meta, labels)):
-        m = dict(m)  # make a copy
-        m["cluster_id"] = int(label)
-        dist = np.linalg.norm(X[i] - centroids[label])
-        m["distance_to_centroid"] = float(dist)
-        meta_with_cluster.append(m)
-
-        clusters[label]["member_indices"].append(i)
-        clusters[label]["member_ids"].append(m["id"])
-        clusters[label]["centroid"] = centroids[label]
-
+        return meta, {}
+
+    diff = X - centroids[labels].astype(X.dtype, copy=False)
+    distances = np.sqrt(np.einsum("ij,ij->i", diff, diff))
+    meta_with_cluster = meta.with_clusters(labels, distances)
+
+    clusters: Dict[int, Dict[str, Any]] = {}
+    for label in np.unique(labels):
+        member_indices = np.flatnonzero(labels == label).tolist()
+        clusters[int(label)] = {
+            "centroid": centroids[label],
+            "member_indices": member_indices,
+            "member_ids": [meta.ids[i] for i in member_indices]
+        }
     return meta_with_cluster, clusters
 
 
@@ -223,12 +302,13 @@ def get_clusters_and_labels(meta_with_cluster: List[Dict[str, Any]], clusters: D
     misc_members = []
     cluster_labels = {}
     for cluster_id, info in clusters.items():
-        members = [meta_with_cluster[i] for i in info["member_indices"]]
-        if len(members) <= n_min:
-            misc_members.extend(members)
+        member_indices = np.asarray(info["member_indices"])
+        if len(member_indices) <= n_min:
+            misc_members.extend(meta_with_cluster[i] for i in member_indices)
             continue
         # Sort members by distance to centroid
-        members_sorted = sorted(members, key=lambda m: m["distance_to_centroid"])
+        order = member_indices[np.argsort(meta_with_cluster.distances[member_indices], kind="stable")]
+        members_sorted = [meta_with_cluster[i] for i in order]
         # Token guard: cap number of representatives per cluster to n_labels
         top_members = members_sorted[:n_labels]
         cluster_labels[cluster_id] = {
@@ -385,18 +465,21 @@ def summarize_repo(cluster_jsons: List[dict], repo_metrics: dict, api_key: Optio
         return {"error": str(e), "raw_output": summary_str}
 
 
-def clusters_to_qdrant(qdrant_client, collection_name: str, meta_with_cluster: list):
+def clusters_to_qdrant(qdrant_client, collection_name: str, meta_with_cluster: PointSet):
     """
-    Updates Qdrant payloads for each point with its assigned cluster_id.
+    Updates Qdrant payloads for each point with its assigned cluster_id
+    (one set_payload request per cluster).
     """
-    for meta in meta_with_cluster:
-        point_id = meta.get("id")
-        cluster_id = meta.get("cluster_id")
-        if point_id is not None and cluster_id is not None:
+    if meta_with_cluster.cluster_ids is None:
+        return
+    for cluster_id in np.unique(meta_with_cluster.cluster_ids):
+        point_ids = [meta_with_cluster.ids[i] for i in np.flatnonzero(meta_with_cluster.cluster_ids == cluster_id)]
+        point_ids = [point_id for point_id in point_ids if point_id is not None]
+        if point_ids:
             qdrant_client.set_payload(
                 collection_name=collection_name,
-                payload={"cluster_id": cluster_id},
-                points=[point_id]
+                payload={"cluster_id": int(cluster_id)},
+                points=point_ids
             )
 
 
@@ -408,12 +491,11 @@ def build_atlas_pack(
     cluster_edge: bool = True,
     file_edge: bool = False
 ) -> dict:
-    # Decide if input is file-level or chunk-level by checking for 'chunk_count' and 'vectors'
+    # Decide if input is file-level (aggregate_chunks_to_files dicts) or chunk-level (ChunkMeta rows)
     is_file_level = (
-        meta_with_cluster
+        len(meta_with_cluster) > 0
         and isinstance(meta_with_cluster[0], dict)
         and "chunk_count" in meta_with_cluster[0]
-        and "vectors" in meta_with_cluster[0]
     )
 
     nodes = []
@@ -451,7 +533,7 @@ def build_atlas_pack(
                 "start_line_no": payload.get("start_line_no"),
                 "end_line_no": payload.get("end_line_no"),
                 "excerpt": payload.get("excerpt", ""),
-                "vector": node["vector"]
+                "vector": node["vector"].tolist()
             })
             ids.append(node["id"])
             vectors.append(node["vector"])
@@ -460,7 +542,7 @@ def build_atlas_pack(
     edge_set = set()
     n_nodes = len(nodes)
     if vectors and n_nodes > 1:
-        vecs_np = np.array(vectors)
+        vecs_np = np.asarray(vectors, dtype=np.float32)
         norms = np.linalg.norm(vecs_np, axis=1)
         safe_k = min(k_sim + 1, n_nodes)
         for i, vec_a in enumerate(vecs_np):
@@ -485,40 +567,49 @@ def compute_content_hash(points: List) -> str:
     Computes a SHA256 hash of the concatenated filepaths and optionally file contents/excerpts.
     Handles both dicts and Qdrant Record objects.
     """
-    def get_payload(pt):
-        if isinstance(pt, dict):
-            return pt.get("payload", {})
-        elif hasattr(pt, "payload"):
-            return pt.payload
-        return {}
-
     hash_input = "".join(
-        str(get_payload(pt).get("filepath", "")) + str(get_payload(pt).get("excerpt", ""))
+        str(_payload_of(pt).get("filepath", "")) + str(_payload_of(pt).get("excerpt", ""))
         for pt in points
     )
     return hashlib.sha256(hash_input.encode("utf-8")).hexdigest()
 
-def aggregate_chunks_to_files(meta_with_cluster: list):
-    file_nodes = {}
-    for meta in meta_with_cluster:
-        fp = meta["filepath"]
-        if fp not in file_nodes:
-            file_nodes[fp] = {
-                "id": fp,
-                "label": os.path.basename(fp),
-                "filepath": fp,
-                "dirpath": os.path.dirname(fp),
-                "cluster_id": meta.get("cluster_id"),
-                "loc": 0,
-                "chunk_count": 0,
-                "vectors": [],
-                "excerpts": [],
-                "summary": meta.get("payload", {}).get("summary", ""),
-            }
-        file_nodes[fp]["chunk_count"] += 1
-        file_nodes[fp]["vectors"].append(meta["vector"])
-        file_nodes[fp]["excerpts"].append(meta.get("payload", {}).get("excerpt", ""))
-        file_nodes[fp]["loc"] += meta.get("payload", {}).get("line_count", 0)
-    for node in file_nodes.values():
-        node["vector"] = np.mean(node["vectors"], axis=0).tolist()
-    return list(file_nodes.values())
\ No newline at end of file
+def aggregate_chunks_to_files(meta_with_cluster: PointSet):
+    """
+    File-level atlas nodes: one per file, with the mean of its chunk vectors,
+    summed line counts and the cluster of its first chunk.
+    """
+    points = meta_with_cluster
+    n_files = points.n_files
+    if len(points) == 0:
+        return []
+    chunk_counts = np.bincount(points.file_idx, minlength=n_files)
+    # Per-file vector sums as a sparse (files x points) one-hot product, no per-row Python work
+    membership = sparse.csr_matrix(
+        (np.ones(len(points), dtype=np.float32), (points.file_idx, np.arange(len(points)))),
+        shape=(n_files, len(points))
+    )
+    means = (membership @ points.X) / chunk_counts[:, None]
+    loc = np.bincount(points.file_idx, minlength=n_files,
+                      weights=[payload.get("line_count", 0) or 0 for payload in points.payloads])
+    # First row of every file (file indices are assigned in order of first appearance)
+    _, first_rows = np.unique(points.file_idx, return_index=True)
+    excerpts = [[] for _ in range(n_files)]
+    for file_id, payload in zip(points.file_idx, points.payloads):
+        excerpts[file_id].append(payload.get("excerpt", ""))
+
+    file_nodes = []
+    for file_id, fp in enumerate(points.filepaths):
+        first = points[int(first_rows[file_id])]
+        file_nodes.append({
+            "id": fp,
+            "label": os.path.basename(fp),
+            "filepath": fp,
+            "dirpath": os.path.dirname(fp),
+            "cluster_id": first.cluster_id,
+            "loc": int(loc[file_id]),
+            "chunk_count": int(chunk_counts[file_id]),
+            "excerpts": excerpts[file_id],
+            "summary": first.payload.get("summary", ""),
+            "vector": means[file_id].tolist()
+        })
+    return file_nodes